@@ -24,12 +24,26 @@ from sugar3.activity.widgets import StopButton
 from sugar3.graphics.toolbutton import ToolButton
 from gettext import gettext as _
 import os
-import json
+import shutil
 import time
+from collections import deque
 from sugar3.graphics.palette import Palette
 from sugar3.graphics import style
 from collabwrapper import CollabWrapper
 from game import Game
+from journal import JournalWriter, MoveLog, remove_stale_logs
+from savefile import SaveFile, SaveFileError
+
+# Set to measure round trip latency of network moves
+LATENCY_ENV = 'ODD_SCORING_LATENCY'
+
+# Longest write_file blocks the main loop waiting for the log
+SAVE_TIMEOUT = 5
+# How often changes made other than by moves, such as the theme, are
+# snapshotted in the background, ready for the Journal
+AUTOSAVE_SECONDS = 5
+# Journal saves whose main loop stalls are kept for the stats
+SAVE_STALLS_KEPT = 50
 
 class OddScoring(activity.Activity):
     def __init__(self, handle):
@@ -38,6 +52,21 @@ class OddScoring(activity.Activity):
         
         self._loaded_from_journal = False
         self._read_file_called = False
+        self._track_latency = bool(os.environ.get(LATENCY_ENV))
+        
+        # The game is logged in the background, as a snapshot followed by
+        # the moves made since, and write_file hands the log to the Journal
+        self._writer = JournalWriter()
+        log_dir = os.path.join(activity.get_activity_root(), 'instance')
+        self._log = MoveLog(self._writer, os.path.join(
+            log_dir, 'game-%s.log' % self.get_id()))
+        remove_stale_logs(log_dir, self._log.path)
+        # Game state the log holds once its moves are applied
+        self._logged_state = None
+        self._snapshot_due = False
+        self._log_update_id = None
+        self._save_stalls = deque(maxlen=SAVE_STALLS_KEPT)
+        self._resume_time = None
         
         # Create toolbar
         self._create_toolbar()
@@ -52,17 +81,20 @@ class OddScoring(activity.Activity):
             return
         
         try:
-            self._collab = CollabWrapper(self)
+            self._collab = CollabWrapper(
+                self, track_latency=self._track_latency)
             self._collab.connect('joined', self.__joined_cb)
             self._collab.connect('buddy_joined', self.__buddy_joined_cb)
             self._collab.connect('buddy_left', self.__buddy_left_cb)
             self._collab.connect('message', self.__message_cb)
+            self._collab.connect('backpressure', self.__backpressure_cb)
         except Exception as e:
             print(f"ERROR: Failed to create CollabWrapper: {e}")
             self._collab = None
         
         if self._collab:
             self.game.set_collab_wrapper(self._collab)
+        self.game.set_move_callback(self.__move_cb)
         
         try:
             game_widget = self.game.get_widget()
@@ -78,6 +110,7 @@ class OddScoring(activity.Activity):
             GLib.timeout_add(500, self._setup_collab)
         
         GLib.timeout_add(200, self._check_and_show_menu)
+        GLib.timeout_add_seconds(AUTOSAVE_SECONDS, self._autosave)
         
     
     def _setup_collab(self):
@@ -135,6 +168,14 @@ class OddScoring(activity.Activity):
         toolbar_box.toolbar.insert(self.help_button, -1)
         self.help_button.show()
         
+        # Network latency button, only when measuring
+        if self._track_latency:
+            stats_button = ToolButton("network-wireless-connected-100")
+            stats_button.set_tooltip("Network Latency")
+            stats_button.connect("clicked", self._show_latency_stats)
+            toolbar_box.toolbar.insert(stats_button, -1)
+            stats_button.show()
+        
         # Separator
         separator = Gtk.SeparatorToolItem()
         separator.props.draw = False
@@ -151,6 +192,11 @@ class OddScoring(activity.Activity):
     
     def _show_help(self, button):
         """Show the help dialog when help button is clicked."""
+        variant_help = ('Tick "Each player scores their own steps" on the '
+                        'menu to count only the steps each player takes. '
+                        'When the finish line is reached, Player 1 wins if '
+                        'their own steps are EVEN, otherwise Player 2 '
+                        'wins.\n')
         help_message = """About the Odd Scoring Game:
 The Odd Scoring Game is a strategic mathematical puzzle that combines position-based movement with parity theory (even/odd numbers). Players must think several moves ahead to control whether the total number of steps taken will be even or odd.
 
@@ -172,7 +218,9 @@ Game Modes:
 • Single Player: Practice against an AI opponent
 • Two Player: Challenge a friend on the same device
 • Collaborative: Share the game with other Sugar users over the network
-"""
+
+Individual Scoring Variant:
+""" + variant_help
         
         self._show_dialog("Odd Scoring Game Help", help_message)
 
@@ -300,6 +348,45 @@ Game Modes:
         dialog.run()
         dialog.destroy()
     
+    def _format_latency_stats(self):
+        stats = self._collab.get_latency_stats() if self._collab else None
+        if not stats or not stats['count']:
+            text = "No network moves measured yet."
+        else:
+            text = (f"Round trip latency of {stats['count']} messages:\n"
+                    f"p50: {stats['p50'] * 1000:.1f} ms\n"
+                    f"p95: {stats['p95'] * 1000:.1f} ms\n"
+                    f"p99: {stats['p99'] * 1000:.1f} ms\n"
+                    f"max: {stats['max'] * 1000:.1f} ms")
+        queue = self._collab.get_queue_stats() if self._collab else None
+        if queue is not None:
+            dropped = "/".join(str(n) for n in queue['dropped'])
+            text += f"\n\nDropped messages (game/sync/cosmetic): {dropped}"
+        handled = self.game.get_dispatch_stats()
+        if handled:
+            text += "\n\nMessages handled:"
+            for action, stats in sorted(handled.items()):
+                text += (f"\n{action}: {stats['count']}, "
+                         f"{stats['mean'] * 1000:.2f} ms avg"
+                         f" ({stats['invalid']} invalid,"
+                         f" {stats['errors']} failed)")
+        init_sync = self._collab.init_sync_time if self._collab else None
+        if init_sync is not None:
+            text += (f"\n\nJoined by {init_sync[0]}"
+                     f" in {init_sync[1] * 1000:.1f} ms")
+        if self._resume_time is not None:
+            text += (f"\n\nResumed from the Journal in"
+                     f" {self._resume_time * 1000:.1f} ms")
+        if self._save_stalls:
+            text += (f"\n\nLast {len(self._save_stalls)} Journal saves: "
+                     f"max {max(self._save_stalls) * 1000:.1f} ms"
+                     f" on the main loop")
+        return text
+
+    def _show_latency_stats(self, button):
+        """Show the network latency histogram summary"""
+        self._show_dialog("Network Latency", self._format_latency_stats())
+
     def _toggle_theme(self, button):
         """Toggle theme"""
         try:
@@ -330,22 +417,30 @@ Game Modes:
             GLib.timeout_add(100, lambda: self.game.show_menu())
             return
         
+        if self._log.outlived(file_path):
+            # The activity stopped without saving the moves logged since
+            print("Recovering moves made after the last Journal save")
+            file_path = self._log.path
+        
         try:
-            with open(file_path, 'r') as f:
-                content = f.read()
-                
-                try:
-                    data = json.loads(content)
-                except json.JSONDecodeError as e:
-                    print(f"ERROR: JSON parsing failed: {e}")
-                    GLib.timeout_add(100, lambda: self.game.show_menu())
-                    return
+            start = time.perf_counter()
+            try:
+                # Only the header and the game state are read here; the
+                # history is read as far as the moves after the state
+                save = SaveFile(file_path)
+                game_state = save.state()
+            except SaveFileError as e:
+                print(f"ERROR: Reading save file failed: {e}")
+                GLib.timeout_add(100, lambda: self.game.show_menu())
+                return
             
-            game_state = data.get('game_state', {})
             if game_state:
                 
                 if hasattr(self.game, 'load_state'):
-                    if self.game.load_state(game_state):
+                    moves = save.moves_after(game_state.get('move_seq', 0))
+                    if self.game.load_state(game_state, moves):
+                        self._resume_log(file_path)
+                        self._resume_time = time.perf_counter() - start
                         self._loaded_from_journal = True
                     else:
                         print("ERROR: game.load_state() returned False")
@@ -364,32 +459,115 @@ Game Modes:
     def write_file(self, file_path):
         """Save game state to Journal"""
         
+        start = time.perf_counter()
         try:
-            data = {
-                'metadata': {
-                    'activity': 'org.sugarlabs.OddScoring',
-                    'activity_version': 1,
-                    'mime_type': 'application/x-odd-scoring-game',
-                    'timestamp': time.time()
-                },
-                'game_state': {}
-            }
-            
-            if hasattr(self.game, 'save_state'):
-                game_state = self.game.save_state()
-                data['game_state'] = game_state
+            game_state = self._game_state()
+            if game_state != self._logged_state:
+                # Changed other than by the logged moves
+                self._snapshot(game_state)
+            written = self._writer.wait(SAVE_TIMEOUT)
+            if written and not self._log.written():
+                # A move could not be appended, so snapshot it instead
+                self._snapshot(game_state)
+                written = self._writer.wait(
+                    max(0, start + SAVE_TIMEOUT - time.perf_counter()))
+            if not written:
+                print("ERROR: Game log still being written, "
+                      "Journal entry not saved")
+            elif self._log.written():
+                self._link_log(file_path)
             else:
-                print("ERROR: game object doesn't have save_state method")
-            
-            json_string = json.dumps(data, indent=2)
-            
-            with open(file_path, 'w') as f:
-                f.write(json_string)
-                f.flush()
-                os.fsync(f.fileno())
-                
+                print("ERROR: Game log not written, Journal entry not saved")
         except Exception as e:
             print(f"ERROR: Writing file failed: {e}")
+        self._save_stalls.append(time.perf_counter() - start)
+
+    def _game_state(self):
+        if hasattr(self.game, 'save_state'):
+            return self.game.save_state()
+        print("ERROR: game object doesn't have save_state method")
+        return {}
+
+    def _resume_log(self, file_path):
+        """Carry on logging in the save just loaded"""
+        try:
+            self._log.resume(file_path)
+        except OSError as e:
+            print(f"ERROR: Resuming game log failed: {e}")
+            return
+        self._snapshot_due = False
+        self._logged_state = self._game_state()
+
+    def __move_cb(self, move):
+        """Called by the game with each move, or None for a new board"""
+        if move is None:
+            self._log.start_game()
+            self._snapshot_due = True
+        elif not self._log.append(move, self.__appended_cb):
+            self._snapshot_due = True
+        self._logged_state = None
+        self._queue_log_update()
+
+    def __appended_cb(self, path, move, error):
+        """Called on the main loop once a move was appended"""
+        if error is not None:
+            # The log may be missing the move, so it no longer holds
+            # the game; replace it with a snapshot
+            self._snapshot_due = True
+            self._logged_state = None
+            self._queue_log_update()
+
+    def _queue_log_update(self):
+        if self._log_update_id is None:
+            self._log_update_id = GLib.idle_add(self._update_log)
+
+    def _autosave(self):
+        """Snapshot the game if it changed other than by moves"""
+        try:
+            if self._log_update_id is None:
+                game_state = self._game_state()
+                if game_state != self._logged_state:
+                    self._snapshot(game_state)
+        except Exception as e:
+            print(f"ERROR: Autosave failed: {e}")
+        return True
+
+    def _update_log(self):
+        """Once the game has finished handling a move, compact the log
+        if it is due and note the state the log now holds"""
+        self._log_update_id = None
+        try:
+            game_state = self._game_state()
+            if self._snapshot_due or self._log.needs_compaction():
+                self._snapshot(game_state)
+            else:
+                self._logged_state = game_state
+        except Exception as e:
+            print(f"ERROR: Logging move failed: {e}")
+        return False
+
+    def _snapshot(self, game_state):
+        self._snapshot_due = False
+        self._logged_state = game_state
+        self._log.snapshot({
+            'metadata': {
+                'activity': 'org.sugarlabs.OddScoring',
+                'activity_version': 1,
+                'mime_type': 'application/x-odd-scoring-game',
+                'timestamp': time.time()
+            },
+            'game_state': game_state
+        })
+
+    def _link_log(self, file_path):
+        # The log is only ever appended to or replaced by renaming over
+        # it, so the Journal can share its contents instead of copying
+        # them, as long as nothing is appended once it has
+        try:
+            os.link(self._log.path, file_path)
+        except OSError:
+            shutil.copyfile(self._log.path, file_path)
+        self._log.share()
 
     def can_close(self):
         """Called when the activity is about to close"""
@@ -398,6 +576,9 @@ Game Modes:
     def close(self):
         """Clean shutdown"""
         super(OddScoring, self).close()
+        # The save has linked the log into the Journal by now
+        if self._log.in_journal():
+            self._log.remove()
     
     def __joined_cb(self, collab):
         """Called when we join a shared activity"""
@@ -414,6 +595,11 @@ Game Modes:
         if self.game:
             self.game.on_buddy_left(buddy)
 
+    def __backpressure_cb(self, collab, priority, congested):
+        """Called when a class of outgoing messages backs up or drains"""
+        if self.game:
+            self.game.on_backpressure(priority, congested)
+
     def __message_cb(self, collab, buddy, message):
         """Called when we receive a message"""
         if self.game:
@@ -421,6 +607,17 @@ Game Modes:
         else:
             print("ERROR: No game object to handle message")
     
+    def get_preview(self):
+        """Journal preview, drawn from the board rather than the screen"""
+        try:
+            board = self.game.get_preview()
+        except Exception as e:
+            print(f"ERROR: Drawing preview failed: {e}")
+            board = None
+        if board is None:
+            return super(OddScoring, self).get_preview()
+        return board
+
     def get_data(self):
         """Called by CollabWrapper when someone joins to get current state"""
         if hasattr(self.game, 'get_game_state_for_sync'):
@@ -0,0 +1,152 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Exact game-length and outcome distributions for the Odd Scoring game.
+
+Instead of simulating games, the distributions are computed by dynamic
+programming over (position, side to move, parity of the total steps).
+Positions are shared by every board size, so a single pass up to the
+largest N answers every N at once.
+
+Each player follows a mixed policy: with probability `mix` they play
+the computer heuristic from `Game._computer_move`, otherwise they pick
+uniformly among the legal moves.  `mix=0` is purely random play.
+
+Note that with the classic rule the total number of steps always ends
+up as N - 1, so the winner only depends on the parity of N; the win
+probabilities are reported for completeness and come out as 0 or 1.
+
+Run from the command line::
+
+    python3 analysis.py --max-n 40 --mix1 0.5 --output lengths.csv
+"""
+
+import argparse
+import csv
+import sys
+from array import array
+
+MAX_STEP = 3
+
+
+def move_probabilities(position, mix):
+    """Probability of moving 1..3 steps from `position` under a policy
+    that plays the computer heuristic with probability `mix`"""
+    legal = min(MAX_STEP, position)
+    probs = [(1.0 - mix) / legal] * legal
+    ideal = position % 4
+    if ideal != 0:
+        probs[min(ideal, legal) - 1] += mix
+    else:
+        for i in range(legal):
+            probs[i] += mix / legal
+    return probs
+
+
+def compute_distributions(max_n, mix1=0.0, mix2=0.0):
+    """Compute exact distributions for every N in 2..max_n.
+
+    Returns a dict with:
+        lengths (list of array): lengths[N][k] is the probability that a
+            game on a board of size N lasts exactly k moves
+        expected_length (list of float): mean number of moves per N
+        player1_win (list of float): probability that player 1 wins per N
+
+    Entries for N < 2 are empty.
+    """
+    max_position = max_n - 1
+    mixes = (mix1, mix2)
+    probs = [[move_probabilities(position, mix) if position else []
+              for position in range(max_position + 1)] for mix in mixes]
+
+    # length[side][position][k]: probability of k more moves from here.
+    length = [[array('d', [1.0])], [array('d', [1.0])]]
+    # win[side][position][parity]: probability player 1 wins from here.
+    win = [[(1.0, 0.0)], [(1.0, 0.0)]]
+
+    for position in range(1, max_position + 1):
+        for side in (0, 1):
+            other = 1 - side
+            dist = array('d', bytes(8 * (position + 1)))
+            even = 0.0
+            odd = 0.0
+            for steps, p in enumerate(probs[side][position], 1):
+                child = length[other][position - steps]
+                for k, q in enumerate(child):
+                    dist[k + 1] += p * q
+                child_win = win[other][position - steps]
+                even += p * child_win[steps & 1]
+                odd += p * child_win[(steps & 1) ^ 1]
+            length[side].append(dist)
+            win[side].append((even, odd))
+
+    lengths = [array('d') for _ in range(min(2, max_n + 1))]
+    expected = [0.0] * len(lengths)
+    player1_win = [0.0] * len(lengths)
+    for n in range(2, max_n + 1):
+        dist = length[0][n - 1]
+        lengths.append(dist)
+        expected.append(sum(k * p for k, p in enumerate(dist)))
+        player1_win.append(win[0][n - 1][0])
+
+    return {
+        'lengths': lengths,
+        'expected_length': expected,
+        'player1_win': player1_win,
+    }
+
+
+def write_csv(results, f, min_n=2):
+    """Write one row per N: N, expected length, P(player 1 wins) and the
+    probability of each game length"""
+    lengths = results['lengths']
+    max_len = max((len(dist) for dist in lengths), default=1) - 1
+    writer = csv.writer(f)
+    header = ['N', 'expected_length', 'player1_win']
+    header.extend(f'len_{k}' for k in range(1, max_len + 1))
+    writer.writerow(header)
+    for n in range(max(2, min_n), len(lengths)):
+        dist = lengths[n]
+        row = [n, f"{results['expected_length'][n]:.6f}",
+               f"{results['player1_win'][n]:.6f}"]
+        row += [f'{dist[k]:.6g}' if k < len(dist) else 0
+                for k in range(1, max_len + 1)]
+        writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Exact game length and outcome distributions')
+    parser.add_argument('--min-n', type=int, default=2)
+    parser.add_argument('--max-n', type=int, default=20)
+    parser.add_argument('--mix1', type=float, default=0.0,
+                        help='chance player 1 plays the computer heuristic')
+    parser.add_argument('--mix2', type=float, default=1.0,
+                        help='chance player 2 plays the computer heuristic')
+    parser.add_argument('--output', default=None,
+                        help='CSV file to write (default: stdout)')
+    args = parser.parse_args()
+
+    results = compute_distributions(args.max_n, args.mix1, args.mix2)
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            write_csv(results, f, args.min_n)
+    else:
+        write_csv(results, sys.stdout, args.min_n)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Join-to-playable time of inline init sync.
+
+A guest joins a host over the loopback transports and the time from
+joining until `set_data` has been called is measured, for init data sent
+inline as a text channel message.  For reference it is also measured
+handed over directly by the loopback hub, which is not a file transfer:
+the Telepathy file transfer used for large or old peers' init data is
+not measured here.  In a shared activity `CollabWrapper.init_sync_time`
+reports the real figure for either path.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from gi.repository import GLib
+
+from collabwrapper import CollabWrapper
+from loopback import LoopbackHub, LoopbackTransport
+
+JOINS = 200
+
+SNAPSHOT = {
+    'game_in_progress': True,
+    'game': 1234567,
+    'players': ['host', 'guest'],
+    'N': 20,
+    'current_position': 11,
+    'total_steps': 8,
+    'player_steps': [5, 3],
+    'move_seq': 4,
+    'state_hash': 305419896,
+    'scoring_rule': 1,
+    'current_player': 1,
+    'game_over': False,
+}
+
+
+class _InlineTransport(LoopbackTransport):
+    '''A loopback endpoint with no out-of-band init path, like the
+    Telepathy text channel.'''
+
+    def send_init_data(self, buddy, data):
+        return False
+
+
+class _Peer(object):
+    '''Just enough of an activity for CollabWrapper.'''
+
+    def __init__(self, data, loop=None):
+        self._data = data
+        self._loop = loop
+
+    def get_data(self):
+        return self._data
+
+    def set_data(self, data):
+        self._loop.quit()
+
+    def get_bundle_id(self):
+        return 'org.sugarlabs.OddScoring'
+
+
+def join(transport_class, data):
+    loop = GLib.MainLoop()
+    hub = LoopbackHub()
+    host_transport = transport_class(hub, 'host')
+    guest_transport = transport_class(hub, 'guest')
+    # Let the inline path carry any size, to compare it with out of band
+    host = CollabWrapper(_Peer(data), inline_init_limit=sys.maxsize)
+    host.attach_transport(host_transport, leader=True)
+    guest = CollabWrapper(_Peer(None, loop))
+
+    start = time.perf_counter()
+    guest.attach_transport(guest_transport)
+    loop.run()
+    elapsed = time.perf_counter() - start
+
+    host_transport.close()
+    guest_transport.close()
+    return elapsed, guest.init_sync_time[0]
+
+
+def measure(name, transport_class, data):
+    times = []
+    for _ in range(JOINS):
+        elapsed, path = join(transport_class, data)
+        times.append(elapsed)
+    times.sort()
+    print(f"{name:<36} via {path:<12}"
+          f"  p50 {times[len(times) // 2] * 1e6:8.1f} us"
+          f"  max {times[-1] * 1e6:8.1f} us")
+
+
+def main():
+    large = dict(SNAPSHOT, history=[1, 2, 3] * 2000)
+    measure('snapshot, inline', _InlineTransport, SNAPSHOT)
+    measure('snapshot, loopback hand-off', LoopbackTransport, SNAPSHOT)
+    measure('6000 move history, inline', _InlineTransport, large)
+    measure('6000 move history, loopback hand-off', LoopbackTransport,
+            large)
+
+
+if __name__ == '__main__':
+    main()
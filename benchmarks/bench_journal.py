@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Cost of Journal saves and of logging moves.
+
+Compares the time `write_file` used to block the main loop, serializing
+indented JSON and syncing it to disk, with the time it blocks now: a
+hard link to the move log when the log is current, or a snapshot and a
+wait for it when the game changed other than by moves.  Then compares
+keeping a save current after every move by appending the move to the
+log, with rewriting the whole save.  The old save holds the history in
+its JSON; the log holds it as move records.  Run it on the storage the activity
+will use; an SD card syncs far slower than a laptop SSD.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from journal import JournalWriter, MoveLog
+
+SAVES = 50
+HISTORIES = (0, 10000)
+
+
+def game_data(moves):
+    return {
+        'metadata': {
+            'activity': 'org.sugarlabs.OddScoring',
+            'activity_version': 1,
+            'mime_type': 'application/x-odd-scoring-game',
+            'timestamp': time.time(),
+        },
+        'game_state': {
+            'game_mode': 1,
+            'current_theme': 'LIGHT',
+            'N': 20,
+            'current_position': 11,
+            'total_steps': 8,
+            'player_steps': [5, 3],
+            'move_seq': 2,
+            'state_hash': 305419896,
+            'scoring_rule': 1,
+            'game_over': False,
+            'current_player': 1,
+            'game_in_progress': True,
+            'history': [1, 2, 3] * (moves // 3),
+        },
+    }
+
+
+def log_with_history(writer, path, data):
+    """A log holding the state of `data` and its history as records"""
+    state = dict(data['game_state'])
+    history = state.pop('history')
+    moves = [{'seq': i + 1, 'player': i % 2 + 1, 'steps': steps}
+             for i, steps in enumerate(history)]
+    log = MoveLog(writer, path, compact_moves=sys.maxsize)
+    log.start_game()
+    for move in moves:
+        log.append(move)
+    log.snapshot(dict(data, game_state=state))
+    writer.wait()
+    return log, state
+
+
+def synchronous(directory, data, i):
+    with open(os.path.join(directory, 'sync-%d' % i), 'w') as f:
+        f.write(json.dumps(data, indent=2))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def linked(directory, log, i):
+    os.link(log.path, os.path.join(directory, 'linked-%d' % i))
+
+
+def snapshotted(directory, log, writer, data, i):
+    log.snapshot(data)
+    writer.wait()
+    os.link(log.path, os.path.join(directory, 'snapshot-%d' % i))
+
+
+def appended(log, writer, first, i):
+    log.append({'seq': first + i, 'player': i % 2 + 1, 'steps': 1})
+    writer.wait()
+
+
+def rewritten(directory, writer, data, i):
+    writer.write(os.path.join(directory, 'rewritten.json'), data)
+    writer.wait()
+
+
+def measure(name, save):
+    times = []
+    for i in range(SAVES):
+        start = time.perf_counter()
+        save(i)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(f"{name:<36} p50 {times[len(times) // 2] * 1000:7.2f} ms"
+          f"  max {times[-1] * 1000:7.2f} ms")
+
+
+def main():
+    writer = JournalWriter()
+    for moves in HISTORIES:
+        data = game_data(moves)
+        with tempfile.TemporaryDirectory() as directory:
+            log, state = log_with_history(
+                writer, os.path.join(directory, 'game.log'), data)
+            snapshot = dict(data, game_state=state)
+            measure(f"{moves} moves, indented + fsync",
+                    lambda i: synchronous(directory, data, i))
+            measure(f"{moves} moves, log current",
+                    lambda i: linked(directory, log, i))
+            measure(f"{moves} moves, log stale",
+                    lambda i: snapshotted(directory, log, writer, snapshot, i))
+            measure(f"{moves} moves, each move appended",
+                    lambda i: appended(log, writer, moves + 1, i))
+            measure(f"{moves} moves, each move rewritten",
+                    lambda i: rewritten(directory, writer, data, i))
+
+
+if __name__ == '__main__':
+    main()
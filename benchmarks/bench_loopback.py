@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""End-to-end move latency and throughput over the loopback transports.
+
+Two `game.Game` objects play each other, wired to `CollabWrapper`s by
+`loopback.connect_game` the way the activity wires them, so the
+measurement covers the game's move handling, encoding, batching, the
+main loop and decoding.  Each player always takes one step, and the
+host starts a new game whenever one ends.  A move's latency runs from
+the mover applying it to the opponent applying it.
+
+`Game` builds its Gtk widgets, so this needs Gtk, sugar3 and a display
+(run it under xvfb-run on a headless machine).  Timing starts once the
+handshake has had time to settle.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from gi.repository import GLib
+
+from collabwrapper import CollabWrapper
+from game import Game
+from loopback import (LoopbackHub, LoopbackTransport, UnixSocketTransport,
+                      connect_game)
+
+MOVES = 2000
+# Time the hello and buddy handshake get before the first game starts
+SETTLE_MS = 100
+
+
+class _Peer(object):
+    '''Just enough of an activity for CollabWrapper.'''
+
+    def __init__(self, game):
+        self.game = game
+
+    def get_data(self):
+        return self.game.get_game_state_for_sync()
+
+    def set_data(self, data):
+        self.game.set_game_state_from_sync(data)
+
+    def get_bundle_id(self):
+        return 'org.sugarlabs.OddScoring'
+
+
+def play(host_transport, guest_transport):
+    loop = GLib.MainLoop()
+    host = Game()
+    guest = Game()
+    for game, transport, leader in ((host, host_transport, True),
+                                    (guest, guest_transport, False)):
+        collab = CollabWrapper(_Peer(game))
+        connect_game(collab, game)
+        collab.attach_transport(transport, leader=leader)
+    latencies = []
+    # (game id, seq) -> time the mover applied it
+    sent = {}
+    timing = {}
+
+    def take_turn(game):
+        if game.game_over:
+            if game is host:
+                next_game()
+        elif game.current_player == game.my_player_number:
+            game._player_move(None, 1)
+        return False
+
+    def next_game():
+        if len(latencies) >= MOVES:
+            timing['elapsed'] = time.perf_counter() - timing['start']
+            loop.quit()
+            return
+        host._start_network_game_direct(None)
+        GLib.idle_add(take_turn, host)
+
+    def on_move(game, move):
+        if move is None or game.active_table is None:
+            return
+        key = (game.active_table.game_id, move['seq'])
+        if move['player'] == game.my_player_number:
+            sent[key] = time.perf_counter()
+        elif key in sent:
+            latencies.append(time.perf_counter() - sent.pop(key))
+        # Once the game has finished handling the move
+        GLib.idle_add(take_turn, game)
+
+    def begin():
+        timing['start'] = time.perf_counter()
+        next_game()
+        return False
+
+    host.set_move_callback(lambda move: on_move(host, move))
+    guest.set_move_callback(lambda move: on_move(guest, move))
+    GLib.timeout_add(SETTLE_MS, begin)
+
+    loop.run()
+    host_transport.close()
+    guest_transport.close()
+    return latencies, timing['elapsed']
+
+
+def report(name, latencies, elapsed):
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f"{name:<12} {len(latencies) / elapsed:8.0f} moves/s"
+          f"  p50 {p50:7.1f} us  p99 {p99:7.1f} us")
+
+
+def main():
+    hub = LoopbackHub()
+    report('in-process', *play(LoopbackTransport(hub, 'host'),
+                               LoopbackTransport(hub, 'guest')))
+
+    path = os.path.join(tempfile.mkdtemp(), 'oddscoring.sock')
+    report('unix socket', *play(UnixSocketTransport(path, 'host', listen=True),
+                                UnixSocketTransport(path, 'guest')))
+
+
+if __name__ == '__main__':
+    main()
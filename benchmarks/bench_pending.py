@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Draining messages queued on the text channel during a reconnect.
+
+Compares acknowledging each message with its own D-Bus call, as the
+received signal handler used to, with draining the whole queue through
+`_TextChannelWrapper.handle_pending_messages`.  The text channel is a
+stand-in that charges `DBUS_CALL_SECONDS` per method call, roughly a
+round trip to a local Telepathy connection manager; set it to what the
+`dbus-monitor` timestamps show on the target machine.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import protocol
+from collabwrapper import (_TextChannelWrapper, CHANNEL_INTERFACE,
+                           CHANNEL_TYPE_TEXT)
+
+DBUS_CALL_SECONDS = 0.0002
+QUEUED = (10, 100, 1000)
+
+
+class _Channel(object):
+    '''A text channel interface holding queued messages.'''
+
+    def __init__(self, count):
+        text = protocol.encode([{'action': 'move', 'game': 1,
+                                 'seq': 1, 'steps': 2}],
+                               protocol.PROTOCOL_VERSION)
+        self.pending = [(i, 0, 7, 0, 0, text) for i in range(count)]
+        self.calls = 0
+
+    def connect_to_signal(self, name, callback):
+        return _Match()
+
+    def ListPendingMessages(self, clear):
+        self.calls += 1
+        time.sleep(DBUS_CALL_SECONDS)
+        return list(self.pending)
+
+    def AcknowledgePendingMessages(self, ids):
+        self.calls += 1
+        time.sleep(DBUS_CALL_SECONDS)
+        acked = set(ids)
+        self.pending = [m for m in self.pending if m[0] not in acked]
+
+
+class _Match(object):
+
+    def remove(self):
+        pass
+
+
+def _wrapper(channel):
+    wrapper = _TextChannelWrapper(
+        {CHANNEL_INTERFACE: channel, CHANNEL_TYPE_TEXT: channel}, None)
+    wrapper.set_received_callback(lambda buddy, msg: None)
+    wrapper._buddies[7] = 'buddy'
+    return wrapper
+
+
+def per_message(count):
+    channel = _Channel(count)
+    wrapper = _wrapper(channel)
+    start = time.perf_counter()
+    for identity, timestamp_, sender, type_, flags_, text in \
+            channel.ListPendingMessages(False):
+        wrapper._dispatch(wrapper._buddies[sender], text)
+        channel.AcknowledgePendingMessages([identity])
+    return time.perf_counter() - start, channel.calls
+
+
+def drained(count):
+    channel = _Channel(count)
+    wrapper = _wrapper(channel)
+    start = time.perf_counter()
+    wrapper.handle_pending_messages()
+    elapsed = time.perf_counter() - start
+    assert not channel.pending
+    return elapsed, channel.calls
+
+
+def main():
+    for count in QUEUED:
+        for name, run in (('per message', per_message),
+                          ('bulk drain', drained)):
+            elapsed, calls = run(count)
+            print(f"{count:5d} queued  {name:<12} {elapsed * 1000:8.2f} ms"
+                  f"  {calls:5d} D-Bus calls")
+
+
+if __name__ == '__main__':
+    main()
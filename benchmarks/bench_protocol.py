@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the JSON and compact wire encodings of a move message."""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import protocol
+
+ROUNDS = 100000
+
+MOVE = {
+    'action': 'move',
+    'game': 1234567,
+    'seq': 7,
+    'steps': 3,
+}
+
+
+def measure(name, version):
+    text = protocol.encode([MOVE], version)
+    assert protocol.decode(text) == [MOVE]
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        protocol.encode([MOVE], version)
+    encode_rate = ROUNDS / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        protocol.decode(text)
+    decode_rate = ROUNDS / (time.perf_counter() - start)
+
+    print(f"{name:<8} {len(text.encode('utf-8')):4d} bytes/move"
+          f"  encode {encode_rate / 1000:8.1f} k/s"
+          f"  decode {decode_rate / 1000:8.1f} k/s")
+
+
+def main():
+    measure('json', 0)
+    measure('compact', protocol.PROTOCOL_VERSION)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Time to resume a saved game on boards of growing size.
+
+Compares `Game.load_state`, which builds the board once and shows the
+saved position, with what it used to do: restore the counters, start
+over with `reset_game` and apply the theme again.  The old path is run
+in network mode, the only mode where it kept the saved board size.
+Needs a display, as the board is made of GTK widgets.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk
+
+from game import Game, GameMode
+
+BOARDS = (20, 200, 1000)
+RESUMES = 5
+
+
+def saved_state(n):
+    return {
+        'game_mode': GameMode.NETWORK_MULTIPLAYER.value,
+        'current_theme': 'LIGHT',
+        'N': n,
+        'current_position': n // 2,
+        'total_steps': n - 1 - n // 2,
+        'player_steps': [n // 4, n - 1 - n // 2 - n // 4],
+        'move_seq': 10,
+        'state_hash': 305419896,
+        'scoring_rule': 1,
+        'game_over': False,
+        'current_player': 1,
+        'is_host': True,
+        'my_player_number': 1,
+        'game_started': True,
+        'game_in_progress': True,
+    }
+
+
+def _flush():
+    while Gtk.events_pending():
+        Gtk.main_iteration()
+
+
+def rebuilt(game, data):
+    game.load_state(dict(data, game_in_progress=False))
+    game.stack.set_visible_child_name("game_page")
+    game.reset_game()
+    game._apply_theme()
+
+
+def restored(game, data):
+    game.load_state(data)
+
+
+def measure(name, game, resume, data):
+    times = []
+    for _ in range(RESUMES):
+        start = time.perf_counter()
+        resume(game, data)
+        _flush()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    p50 = times[len(times) // 2]
+    print(f"N={data['N']:<5} {name:<10} p50 {p50 * 1000:8.1f} ms"
+          f"  max {times[-1] * 1000:8.1f} ms")
+
+
+def main():
+    window = Gtk.Window()
+    game = Game()
+    window.add(game.get_widget())
+    window.show_all()
+    _flush()
+    for n in BOARDS:
+        data = saved_state(n)
+        measure('rebuilt', game, rebuilt, data)
+        measure('restored', game, restored, data)
+
+
+if __name__ == '__main__':
+    main()
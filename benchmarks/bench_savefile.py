@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Reading a save to resume it, as JSON and as a save file.
+
+For games with 1k and 100k move histories, measures the size of the
+save and the time to get the game state and the moves made after it:
+parsing the whole JSON document as `read_file` used to, and reading the
+header, the state section and the end of the history of a `savefile`.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import savefile
+
+HISTORIES = (1000, 100000)
+# Moves made since the state was saved
+TAIL = 10
+READS = 20
+
+METADATA = {
+    'activity': 'org.sugarlabs.OddScoring',
+    'activity_version': 1,
+    'mime_type': 'application/x-odd-scoring-game',
+    'timestamp': 0,
+}
+
+
+def game(moves):
+    history = [{'seq': i + 1, 'player': i % 2 + 1, 'steps': i % 3 + 1}
+               for i in range(moves)]
+    state = {
+        'game_mode': 1,
+        'current_theme': 'LIGHT',
+        'N': 20,
+        'current_position': 11,
+        'total_steps': 8,
+        'player_steps': [5, 3],
+        'move_seq': moves - TAIL,
+        'state_hash': 305419896,
+        'scoring_rule': 1,
+        'game_over': False,
+        'current_player': 1,
+        'game_in_progress': True,
+    }
+    return state, history
+
+
+def read_json(path):
+    with open(path) as f:
+        data = json.loads(f.read())
+    state = data['game_state']
+    return state, [move for move in data['history']
+                   if move['seq'] > state['move_seq']]
+
+
+def read_savefile(path):
+    save = savefile.SaveFile(path)
+    state = save.state()
+    return state, save.moves_after(state['move_seq'])
+
+
+def measure(name, path, read):
+    times = []
+    for _ in range(READS):
+        start = time.perf_counter()
+        state_, tail = read(path)
+        times.append(time.perf_counter() - start)
+    assert len(tail) == TAIL
+    times.sort()
+    print(f"{name:<24} {os.path.getsize(path):9d} bytes"
+          f"  p50 {times[len(times) // 2] * 1000:8.2f} ms"
+          f"  max {times[-1] * 1000:8.2f} ms")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for moves in HISTORIES:
+            state, history = game(moves)
+            json_path = os.path.join(directory, 'save.json')
+            with open(json_path, 'w') as f:
+                f.write(json.dumps({'metadata': METADATA,
+                                    'game_state': state,
+                                    'history': history}, indent=2))
+            save_path = os.path.join(directory, 'save.ossv')
+            with open(save_path, 'wb') as f:
+                f.write(savefile.encode(METADATA, state,
+                                        savefile.encode_moves(history)))
+            measure(f"{moves} moves, JSON", json_path, read_json)
+            measure(f"{moves} moves, save file", save_path, read_savefile)
+
+
+if __name__ == '__main__':
+    main()
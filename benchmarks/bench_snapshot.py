@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Snapshot size and join time with each codec.
+
+For states carrying 1k and 100k move histories, measures the encoded
+size, the time to encode it, and the time to decode it in transfer-sized
+pieces.  Join time adds the transfer at `LINK_BYTES_PER_SECOND`, about
+what a busy school mesh sustains; change it to match the network.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import snapshot
+
+HISTORIES = (1000, 100000)
+CHUNK = 64 * 1024
+LINK_BYTES_PER_SECOND = 250000
+
+
+def state_with_history(moves):
+    rng = random.Random(moves)
+    return {
+        'game_in_progress': True,
+        'game': 1234567,
+        'players': ['host', 'guest'],
+        'N': 20,
+        'current_position': 11,
+        'total_steps': 8,
+        'player_steps': [5, 3],
+        'move_seq': moves,
+        'state_hash': 305419896,
+        'scoring_rule': 1,
+        'current_player': 1,
+        'game_over': False,
+        'history': [rng.randint(1, 3) for _ in range(moves)],
+    }
+
+
+def measure(moves, name, codecs, codec=None):
+    data = state_with_history(moves)
+
+    start = time.perf_counter()
+    blob = snapshot.encode(data, codecs, codec)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoder = snapshot.Decoder()
+    for i in range(0, len(blob), CHUNK):
+        decoder.feed(blob[i:i + CHUNK])
+    assert decoder.finish() == data
+    decode_time = time.perf_counter() - start
+
+    join_time = encode_time + len(blob) / LINK_BYTES_PER_SECOND + decode_time
+    print(f"{moves:6d} moves  {name:<6} {len(blob):9d} bytes"
+          f"  encode {encode_time * 1000:7.1f} ms"
+          f"  decode {decode_time * 1000:7.1f} ms"
+          f"  join {join_time * 1000:8.1f} ms")
+
+
+def main():
+    for moves in HISTORIES:
+        measure(moves, 'json', None)
+        measure(moves, 'zlib', snapshot.SUPPORTED, 'zlib')
+        measure(moves, 'lzma', snapshot.SUPPORTED, 'lzma')
+        measure(moves, 'auto', snapshot.SUPPORTED)
+
+
+if __name__ == '__main__':
+    main()
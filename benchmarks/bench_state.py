@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare tuple-keyed lookups with the solver's packed-state lookups.
+
+Measures lookup throughput and the peak memory allocated while the
+bot's inner loop looks up a move for every state of a board.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import state
+from solver import IndividualParitySolver
+
+MAX_POSITION = 60
+ROUNDS = 200
+
+
+def _states():
+    for position in range(1, MAX_POSITION + 1):
+        for side in (0, 1):
+            for p1 in (0, 1):
+                for p2 in (0, 1):
+                    yield position, side, p1, p2
+
+
+def bench_tuple_dict(solver):
+    table = {}
+    for position, side, p1, p2 in _states():
+        my, opp = (p1, p2) if side == 0 else (p2, p1)
+        table[(position, side, p1, p2)] = solver.best_move(
+            position, my, opp, side)
+    live = list(_states())
+
+    def run():
+        move = 0
+        for position, side, p1, p2 in live:
+            move = table[(position, side, p1, p2)]
+        return move
+    return run
+
+
+def bench_solver_direct(solver):
+    keys = [state.encode(position, side, 0, p1, p2)
+            for position, side, p1, p2 in _states()]
+
+    def run():
+        move = 0
+        move_for_state = solver.move_for_state
+        for key in keys:
+            move = move_for_state(key)
+        return move
+    return run
+
+
+def measure(name, run):
+    run()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        run()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    run()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    lookups = ROUNDS * MAX_POSITION * 8
+    print(f"{name:<22} {lookups / elapsed / 1e6:8.2f} M lookups/s"
+          f"  {peak:6d} bytes allocated at peak")
+
+
+def main():
+    solver = IndividualParitySolver(MAX_POSITION)
+    measure('tuple-keyed dict', bench_tuple_dict(solver))
+    measure('packed solver lookup', bench_solver_direct(solver))
+
+
+if __name__ == '__main__':
+    main()
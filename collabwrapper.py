@@ -65,7 +65,13 @@ Using CollabWrapper
 
 import os
 import json
+import math
+import random
+from collections import deque
 import socket
+import struct
+import time
+import zlib
 from gettext import gettext as _
 
 import gi
@@ -95,12 +101,94 @@ from sugar3.presence import presenceservice
 from sugar3.activity.activity import SCOPE_PRIVATE
 from sugar3.graphics.alert import NotifyAlert
 
+import protocol
+import snapshot
+from dispatcher import Dispatcher
+
 import logging
 _logger = logging.getLogger('CollabWrapper')
 
 ACTION_INIT_REQUEST = '!!ACTION_INIT_REQUEST'
 ACTION_INIT_RESPONSE = '!!ACTION_INIT_RESPONSE'
+ACTION_HELLO = '!!ACTION_HELLO'
+ACTION_PING = '!!ACTION_PING'
+ACTION_PONG = '!!ACTION_PONG'
+ACTION_FT_RESUME = '!!ACTION_FT_RESUME'
 ACTIVITY_FT_MIME = 'x-sugar/from-activity'
+ACTIVITY_STREAM_MIME = 'x-sugar/from-activity-stream'
+
+# Pings awaiting an echo; older ones are forgotten
+LATENCY_PENDING = 256
+# Init data up to this many bytes of JSON is sent over the text channel
+# rather than through a file transfer
+INLINE_INIT_LIMIT = 8192
+# An interrupted chunked transfer is offered again this many times
+FT_MAX_RESUMES = 3
+# Init data whose transfer failed is asked for again this many times
+INIT_RETRIES = 1
+# Seconds a cancelled chunked transfer waits to be asked for again
+FT_RESUME_WAIT = 30
+# Identities of received text messages remembered, so a message that
+# is both drained from the pending queue and signalled is handled once
+PENDING_SEEN = 256
+
+# Priority classes of outgoing messages, sent in this order
+PRIORITY_GAME = 0
+PRIORITY_SYNC = 1
+PRIORITY_COSMETIC = 2
+# Messages of each class that may wait to be sent before more are
+# dropped; game messages never are
+QUEUE_LIMITS = (None, 64, 32)
+# Most messages sent together; the rest wait for the next main loop
+# iteration
+FLUSH_BUDGET = 32
+
+
+class LatencyHistogram(object):
+    '''
+    Fixed-size histogram of latencies in seconds.  Bucket 0 holds
+    everything up to `BASE`, after that each bucket is a quarter of an
+    octave wide, so 64 buckets cover up to about 6.5 seconds.
+    '''
+
+    BUCKETS = 64
+    BASE = 0.0001
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= self.BASE:
+            i = 0
+        else:
+            i = min(self.BUCKETS - 1,
+                    int(math.ceil(math.log2(seconds / self.BASE) * 4)))
+        self.counts[i] += 1
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        '''Upper bound of the bucket holding the p-th percentile.'''
+        if self.count == 0:
+            return None
+        target = max(1, int(math.ceil(self.count * p / 100.0)))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self.max, self.BASE * 2 ** (i / 4.0))
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
 
 
 class CollabWrapper(GObject.GObject):
@@ -137,8 +225,21 @@ class CollabWrapper(GObject.GObject):
     shared activity.  The signal is not emitted during quit.  The signal
     passes a :class:`sugar3.presence.buddy.Buddy` as the only argument.
 
+    The leader sends the result of `get_data` as a text channel message
+    when its JSON fits in `inline_init_limit` bytes and the joiner speaks
+    `protocol.INLINE_INIT_VERSION`, and through a file transfer
+    otherwise, as a snapshot compressed with a codec the joiner
+    announced (see snapshot.py).  `init_sync_time` records how
+    the caller's init data arrived and how long after the request, as a
+    `(path, seconds)` tuple.
+
     Any buddy may call `post` to send a message to all buddies.  Each
-    buddy will receive a `message` signal.
+    buddy will receive a `message` signal.  Messages are sent in order
+    of their priority class: game moves, then sync, then cosmetic
+    traffic such as chat or telemetry.  Only a bounded number of sync
+    and cosmetic messages may be waiting; beyond that `post` drops them
+    and returns False, and the `backpressure` signal is emitted with
+    the class and True until its queue has drained by half.
 
     The `message` signal is emitted when a `post` is received from any
     buddy.  The signal has two arguments.  The first is a
@@ -151,6 +252,11 @@ class CollabWrapper(GObject.GObject):
     The `incoming_file` signal is emitted when a file transfer is
     received.  The signal has two arguments.  The first is a
     :class:`IncomingFileTransfer`.  The second is the description.
+
+    Transfers to buddies that speak `protocol.STREAM_TRANSFER_VERSION`
+    are sent in checksummed chunks.  If one is interrupted, the receiver
+    asks for it again and it continues from the last verified chunk,
+    on the same :class:`IncomingFileTransfer` object.
     '''
 
     message = GObject.Signal('message', arg_types=[object, object])
@@ -158,15 +264,57 @@ class CollabWrapper(GObject.GObject):
     buddy_joined = GObject.Signal('buddy_joined', arg_types=[object])
     buddy_left = GObject.Signal('buddy_left', arg_types=[object])
     incoming_file = GObject.Signal('incoming_file', arg_types=[object, object])
+    backpressure = GObject.Signal('backpressure', arg_types=[int, bool])
 
-    def __init__(self, activity):
+    def __init__(self, activity, track_latency=False,
+                 inline_init_limit=INLINE_INIT_LIMIT):
         _logger.debug('__init__')
         GObject.GObject.__init__(self)
         self.activity = activity
-        self.shared_activity = activity.shared_activity
+        self.shared_activity = getattr(activity, 'shared_activity', None)
         self._leader = False
         self._init_waiting = False
+        self._init_requested_at = None
+        self._init_retries = 0
+        self.init_sync_time = None
+        self.inline_init_limit = inline_init_limit
         self._text_channel = None
+        # Buddy key -> wire protocol version announced in their hello
+        self._peer_versions = {}
+        # Buddy key -> snapshot codecs announced in their hello, None
+        # for peers that predate compressed snapshots
+        self._peer_codecs = {}
+        # Buddy keys of peers whose hello says they echo pings
+        self._peer_pongs = set()
+        self._peers = set()
+        # Round trip times of posted messages, measured by following
+        # each one with a ping that one of the peers echoes back.
+        self._latency = LatencyHistogram() if track_latency else None
+        self._next_ping = 0
+        self._ping_times = [None] * LATENCY_PENDING
+        # Transfer id -> (buddy key, function offering the transfer
+        # again, transfer last offered), for chunked transfers a
+        # receiver may resume
+        self._outgoing_streams = {}
+        # Transfer id -> interrupted IncomingFileTransfer
+        self._partial_transfers = {}
+
+        # Messages for the wrapper itself; anything else is emitted
+        # as `message`
+        self.dispatcher = Dispatcher(default=self.__emit_message)
+        self.dispatcher.register(ACTION_HELLO, self.__hello_received,
+                                 {'protocol': int})
+        self.dispatcher.register(ACTION_PING, self.__ping_received,
+                                 {'id': int})
+        self.dispatcher.register(ACTION_PONG, self.__pong_received,
+                                 {'id': int})
+        self.dispatcher.register(ACTION_INIT_REQUEST,
+                                 self.__init_request_received)
+        self.dispatcher.register(ACTION_INIT_RESPONSE,
+                                 self.__init_response_received,
+                                 {'data': dict})
+        self.dispatcher.register(ACTION_FT_RESUME,
+                                 self.__resume_received, {'transfer': int})
 
     def setup(self):
         '''
@@ -223,6 +371,7 @@ class CollabWrapper(GObject.GObject):
         self.shared_activity = self.activity.shared_activity
         self._setup_text_channel()
         self._listen_for_channels()
+        self._send_hello()
 
     def __joined_cb(self, sender):
         '''Callback for when an activity is joined.'''
@@ -233,14 +382,41 @@ class CollabWrapper(GObject.GObject):
 
         self._setup_text_channel()
         self._listen_for_channels()
-        self._init_waiting = True
-        self.post({'action': ACTION_INIT_REQUEST})
+        self._text_channel.cache_members()
+        self._send_hello()
+        self._request_init()
 
         for buddy in self.shared_activity.get_joined_buddies():
+            self._peers.add(buddy_key(buddy))
             self.buddy_joined.emit(buddy)
+        self._update_protocol_version()
 
         self.joined.emit()
 
+    def attach_transport(self, transport, leader=False):
+        '''
+        Collaborate over a :class:`MessageTransport` instead of the
+        Telepathy text channel of a shared activity, for example one of
+        the loopback transports used for headless testing.
+
+        The same signals are emitted as for a shared activity.  If
+        `leader` is False, the caller joins: `set_data` will be called
+        with the leader's `get_data` and `joined` is emitted.
+        '''
+        _logger.debug('attach_transport')
+        self._leader = leader
+        self._text_channel = transport
+        transport.set_received_callback(self.__received_cb)
+        transport.set_buddy_callbacks(self.__buddy_joined_cb,
+                                      self.__buddy_left_cb)
+        transport.set_init_callback(self._receive_init_data)
+        transport.set_backpressure_callback(self.__backpressure_cb)
+        transport.open()
+        self._send_hello()
+        if not leader:
+            self._request_init()
+            self.joined.emit()
+
     def _setup_text_channel(self):
         ''' Set up a text channel to use for collaboration. '''
         _logger.debug('_setup_text_channel')
@@ -251,6 +427,10 @@ class CollabWrapper(GObject.GObject):
         # Tell the text channel what callback to use for incoming
         # text messages.
         self._text_channel.set_received_callback(self.__received_cb)
+        self._text_channel.set_backpressure_callback(self.__backpressure_cb)
+        # Messages that arrived before we were listening, for example
+        # while reconnecting, are still waiting on the channel.
+        GLib.idle_add(self._text_channel.handle_pending_messages)
 
         # Tell the text channel what callbacks to use when buddies
         # come and go.
@@ -275,44 +455,136 @@ class CollabWrapper(GObject.GObject):
 
     def _handle_ft_channel(self, conn, path, props):
         _logger.debug('_handle_ft_channel')
+        transfer_id, description_ = _parse_stream_description(
+            props.get(CHANNEL_TYPE_FILE_TRANSFER + '.ContentType'),
+            props.get(CHANNEL_TYPE_FILE_TRANSFER + '.Description'))
+        previous = self._partial_transfers.pop(transfer_id, None)
+        if previous is not None:
+            previous.resume(conn, path)
+            return
+
         ft = IncomingFileTransfer(conn, path, props)
+        if ft.chunked:
+            ft.connect('interrupted', self.__transfer_interrupted_cb)
         if ft.description == ACTION_INIT_RESPONSE:
-            ft.connect('ready', self.__ready_cb)
-            ft.accept_to_memory()
+            # Decompress the snapshot as it arrives, rather than after
+            # it has all been buffered.
+            decoder = snapshot.Decoder()
+            ft.connect('ready', self.__ready_cb, decoder)
+            ft.connect('failed', self.__init_failed_cb)
+            ft.accept_to_stream(decoder.feed)
         else:
             desc = json.loads(ft.description)
             self.incoming_file.emit(ft, desc)
 
-    def __ready_cb(self, ft, stream):
+    def __ready_cb(self, ft, output_, decoder):
         _logger.debug('__ready_cb')
         if self._init_waiting:
-            stream.close(None)
-            # FIXME:  The data prop seems to just be the raw pointer
-            gbytes = stream.steal_as_bytes()
-            data = gbytes.get_data()
-            _logger.debug('Got init data from buddy: %r', data)
-            data = json.loads(data)
+            try:
+                data = decoder.finish()
+            except snapshot.SnapshotError as e:
+                self.__init_failed_cb(ft, e)
+                return
+            self._receive_init_data(data, 'file transfer')
+
+    def __init_failed_cb(self, ft, error):
+        _logger.error('Init data transfer failed: %s' % error)
+        if not self._init_waiting:
+            return
+        if self._init_retries < INIT_RETRIES:
+            self._init_retries += 1
+            self._request_init()
+        else:
+            self._alert(_('Joining activity failed'),
+                        _('The activity could not be received'))
+
+    def __transfer_interrupted_cb(self, ft, verified_bytes):
+        if ft.resumes < FT_MAX_RESUMES:
+            _logger.debug('Resuming transfer %r after %d bytes' %
+                          (ft.transfer_id, verified_bytes))
+            self._partial_transfers[ft.transfer_id] = ft
+            self.post({'action': ACTION_FT_RESUME,
+                       'transfer': ft.transfer_id}, PRIORITY_SYNC)
+        else:
+            ft.failed.emit(ConnectionError(
+                'Gave up after %d resumes' % ft.resumes))
+
+    def _request_init(self):
+        self._init_waiting = True
+        self._init_requested_at = time.monotonic()
+        self.post({'action': ACTION_INIT_REQUEST}, PRIORITY_SYNC)
+
+    def _receive_init_data(self, data, path='transport'):
+        if self._init_waiting:
             self.activity.set_data(data)
             self._init_waiting = False
+            self.init_sync_time = (
+                path, time.monotonic() - self._init_requested_at)
+            _logger.debug('Init data arrived by %s after %.3fs' %
+                          self.init_sync_time)
+
+    def _send_init_data(self, buddy):
+        '''Answer a buddy's init request with the result of `get_data`.'''
+        data = self.activity.get_data()
+        if data is None or self._text_channel.send_init_data(buddy, data):
+            return
+        text = json.dumps(data)
+        if len(text) <= self.inline_init_limit and \
+                self.get_peer_version(buddy) >= protocol.INLINE_INIT_VERSION:
+            # Small enough that setting up a file transfer channel would
+            # take far longer than the data itself.
+            self.post({'action': ACTION_INIT_RESPONSE,
+                       'to': buddy_key(buddy), 'data': data}, PRIORITY_SYNC)
+        else:
+            blob = snapshot.encode(data,
+                                   self._peer_codecs.get(buddy_key(buddy)))
+            self._start_transfer(buddy, OutgoingBlobTransfer, blob,
+                                 ACTION_INIT_RESPONSE)
 
     def __received_cb(self, buddy, msg):
         '''Process a message when it is received.'''
         _logger.debug('__received_cb')
-        action = msg.get('action')
-        if action == ACTION_INIT_REQUEST:
-            if self._leader:
-                data = self.activity.get_data()
-                if data is not None:
-                    data = json.dumps(data)
-                    OutgoingBlobTransfer(
-                        buddy,
-                        self.shared_activity.telepathy_conn,
-                        data,
-                        self.get_client_name(),
-                        ACTION_INIT_RESPONSE,
-                        ACTIVITY_FT_MIME)
+        self.dispatcher.dispatch(buddy, msg, self.get_peer_version(buddy))
+
+    def __hello_received(self, buddy, msg):
+        key = buddy_key(buddy)
+        if key not in self._peer_versions:
+            # Let a newcomer know what we speak as well.
+            self._send_hello()
+        self._peer_versions[key] = msg['protocol']
+        self._peer_codecs[key] = msg.get('codecs')
+        if msg.get('pong'):
+            self._peer_pongs.add(key)
+        else:
+            self._peer_pongs.discard(key)
+        self._update_protocol_version()
+
+    def __ping_received(self, buddy, msg):
+        # Each ping names one peer to echo it; older pingers name none
+        if msg.get('echo', self.get_own_key()) != self.get_own_key():
             return
+        # Echoed with the moves, so the round trip is a move's
+        self.post({'action': ACTION_PONG, 'id': msg['id'],
+                   'to': buddy_key(buddy)}, PRIORITY_GAME)
+
+    def __pong_received(self, buddy, msg):
+        if msg.get('to', self.get_own_key()) == self.get_own_key():
+            self._pong_received(msg['id'])
+
+    def __init_request_received(self, buddy, msg):
+        if self._leader:
+            self._send_init_data(buddy)
+
+    def __init_response_received(self, buddy, msg):
+        if self._init_waiting and msg.get('to') == self.get_own_key():
+            self._receive_init_data(msg['data'], 'text channel')
+
+    def __resume_received(self, buddy, msg):
+        stream = self._outgoing_streams.get(msg['transfer'])
+        if stream is not None:
+            stream[1]()
 
+    def __emit_message(self, buddy, msg):
         if buddy:
             nick = buddy.props.nick
         else:
@@ -320,6 +592,10 @@ class CollabWrapper(GObject.GObject):
         _logger.debug('Received message from %s: %r', nick, msg)
         self.message.emit(buddy, msg)
 
+    def get_peer_version(self, buddy):
+        '''The wire protocol version a buddy announced, 0 if unknown.'''
+        return self._peer_versions.get(buddy_key(buddy), 0)
+
     def send_file_memory(self, buddy, data, description):
         '''
         Send a one to one file transfer from memory to a buddy.  The
@@ -333,13 +609,8 @@ class CollabWrapper(GObject.GObject):
                 transfer.  This will be given to the
                 `incoming_transfer` signal at the buddy.
         '''
-        OutgoingBlobTransfer(
-            buddy,
-            self.shared_activity.telepathy_conn,
-            data,
-            self.get_client_name(),
-            json.dumps(description),
-            ACTIVITY_FT_MIME)
+        self._start_transfer(buddy, OutgoingBlobTransfer, data,
+                             json.dumps(description))
 
     def send_file_file(self, buddy, path, description):
         '''
@@ -354,15 +625,49 @@ class CollabWrapper(GObject.GObject):
                 transfer.  This will be given to the
                 `incoming_transfer` signal at the buddy.
         '''
-        OutgoingFileTransfer(
-            buddy,
-            self.shared_activity.telepathy_conn,
-            path,
-            self.get_client_name(),
-            json.dumps(description),
-            ACTIVITY_FT_MIME)
+        self._start_transfer(buddy, OutgoingFileTransfer, path,
+                             json.dumps(description))
 
-    def post(self, msg):
+    def _start_transfer(self, buddy, transfer_class, source, description):
+        '''Offer a transfer, chunked if the buddy can receive that.'''
+        conn = self.shared_activity.telepathy_conn
+        key = buddy_key(buddy)
+        if self._peer_versions.get(key, 0) < protocol.STREAM_TRANSFER_VERSION:
+            return transfer_class(buddy, conn, source,
+                                  self.get_client_name(), description,
+                                  ACTIVITY_FT_MIME)
+
+        transfer_id = random.getrandbits(63)
+        envelope = json.dumps({'transfer': transfer_id,
+                               'description': description})
+
+        def offer():
+            ft = transfer_class(buddy, conn, source,
+                                self.get_client_name(), envelope,
+                                ACTIVITY_STREAM_MIME, chunked=True)
+            ft.connect('notify::state', self.__outgoing_state_cb,
+                       transfer_id)
+            self._outgoing_streams[transfer_id] = (key, offer, ft)
+            return ft
+
+        return offer()
+
+    def __outgoing_state_cb(self, ft, pspec, transfer_id):
+        if ft.props.state == FT_STATE_COMPLETED:
+            self._outgoing_streams.pop(transfer_id, None)
+        elif ft.props.state == FT_STATE_CANCELLED:
+            # The receiver cancels an interrupted transfer before asking
+            # for it again, so give it a while to do so
+            GLib.timeout_add_seconds(FT_RESUME_WAIT, self._expire_stream,
+                                     transfer_id, ft)
+
+    def _expire_stream(self, transfer_id, ft):
+        stream = self._outgoing_streams.get(transfer_id)
+        if stream is not None and stream[2] is ft:
+            del self._outgoing_streams[transfer_id]
+        return False
+
+    def post(self, msg, priority=PRIORITY_GAME):
         '''
         Send a message to all buddies.  If the activity is not shared,
         no message is sent.
@@ -370,18 +675,118 @@ class CollabWrapper(GObject.GObject):
         Args:
             msg (object): json encodable object to send,
                 eg. :class:`dict` or :class:`str`.
+            priority (PRIORITY_*): class of the message
+
+        Returns: bool, False if the message was dropped because too many
+            of its class are waiting to be sent
         '''
-        if self._text_channel is not None:
-            self._text_channel.post(msg)
+        if self._text_channel is None:
+            return False
+        if not self._text_channel.post(msg, priority):
+            return False
+        if self._latency is not None and priority == PRIORITY_GAME and \
+                isinstance(msg, dict) and \
+                not str(msg.get('action', '')).startswith('!!') and \
+                self._peers and self._peers <= self._peer_pongs:
+            self._send_ping()
+        return True
+
+    def get_queue_stats(self):
+        '''
+        Outgoing messages waiting and dropped so far, per priority class.
+
+        Returns: dict with `queued` and `dropped` lists, indexed by
+            PRIORITY_*
+        '''
+        if self._text_channel is None:
+            return None
+        return self._text_channel.get_queue_stats()
+
+    def __backpressure_cb(self, priority, congested):
+        self.backpressure.emit(priority, congested)
+
+    def _send_ping(self):
+        ping_id = self._next_ping
+        self._next_ping += 1
+        self._ping_times[ping_id % LATENCY_PENDING] = \
+            (ping_id, time.monotonic())
+        # One peer echoes each ping, in turn, so tracking costs a pong
+        # per move however many peers there are
+        peers = sorted(self._peers)
+        self._text_channel.post({'action': ACTION_PING, 'id': ping_id,
+                                 'echo': peers[ping_id % len(peers)]},
+                                PRIORITY_GAME)
+
+    def _pong_received(self, ping_id):
+        if self._latency is None or not isinstance(ping_id, int):
+            return
+        slot = ping_id % LATENCY_PENDING
+        sent = self._ping_times[slot]
+        if sent is not None and sent[0] == ping_id:
+            # Only the first peer to echo a ping counts
+            self._ping_times[slot] = None
+            self._latency.add(time.monotonic() - sent[1])
+
+    def get_latency_stats(self):
+        '''
+        Round trip latency of posted messages, or None if the wrapper
+        was not created with `track_latency`.
+
+        Returns: dict with `count`, and `p50`, `p95`, `p99` and `max`
+            in seconds
+        '''
+        if self._latency is None:
+            return None
+        return self._latency.summary()
+
+    def _send_hello(self):
+        self.post({'action': ACTION_HELLO,
+                   'protocol': protocol.PROTOCOL_VERSION,
+                   'codecs': list(snapshot.SUPPORTED),
+                   'pong': True})
+
+    def _update_protocol_version(self):
+        '''Use the newest wire protocol every current peer understands.'''
+        if self._text_channel is None:
+            return
+        if self._peers:
+            version = min(self._peer_versions.get(key, 0)
+                          for key in self._peers)
+        else:
+            version = 0
+        self._text_channel.protocol_version = version
 
     def __buddy_joined_cb(self, sender, buddy):
         '''A buddy joined.'''
+        self._peers.add(buddy_key(buddy))
+        self._update_protocol_version()
         self.buddy_joined.emit(buddy)
 
     def __buddy_left_cb(self, sender, buddy):
         '''A buddy left.'''
+        key = buddy_key(buddy)
+        self._peers.discard(key)
+        self._peer_versions.pop(key, None)
+        self._peer_codecs.pop(key, None)
+        self._peer_pongs.discard(key)
+        self._update_protocol_version()
+        for transfer_id in [t for t, stream in self._outgoing_streams.items()
+                            if stream[0] == key]:
+            del self._outgoing_streams[transfer_id]
+        if self._text_channel is not None:
+            self._text_channel.forget_buddy(buddy)
         self.buddy_left.emit(buddy)
 
+    def get_own_key(self):
+        '''
+        Get the key of our own buddy, matching :func:`buddy_key` of the
+        buddy other participants see our messages from.
+        '''
+        own_buddy = getattr(self._text_channel, 'buddy', None)
+        if own_buddy is None:
+            own_buddy = presenceservice.get_instance().get_owner()
+        return buddy_key(own_buddy)
+
     def get_client_name(self):
         '''
         Get the name of the activity's telepathy client.
@@ -400,6 +805,16 @@ class CollabWrapper(GObject.GObject):
         return self._leader
 
 
+def buddy_key(buddy):
+    '''A stable identity for a buddy, whichever object represents it.'''
+    if isinstance(buddy, dict):
+        return buddy.get('nick')
+    try:
+        return buddy.props.key
+    except Exception:
+        return buddy
+
+
 FT_STATE_NONE = 0
 FT_STATE_PENDING = 1
 FT_STATE_ACCEPTED = 2
@@ -415,6 +830,98 @@ FT_REASON_LOCAL_ERROR = 4
 FT_REASON_LOCAL_ERROR = 5
 FT_REASON_REMOTE_ERROR = 6
 
+# Chunked transfers carry their data in chunks of this many bytes, each
+# framed with its length and CRC32
+FT_CHUNK_SIZE = 64 * 1024
+_CHUNK_HEADER = struct.Struct('>II')
+_FRAME_SIZE = _CHUNK_HEADER.size + FT_CHUNK_SIZE
+
+
+class ChunkChecksumError(ValueError):
+    pass
+
+
+def frame_chunk(data):
+    return _CHUNK_HEADER.pack(len(data), zlib.crc32(data)) + data
+
+
+def framed_size(size):
+    '''Size on the wire of `size` bytes sent in chunks.'''
+    chunks = (size + FT_CHUNK_SIZE - 1) // FT_CHUNK_SIZE
+    return size + chunks * _CHUNK_HEADER.size
+
+
+def _parse_stream_description(mime, description):
+    '''Split the description of a chunked transfer into its transfer id
+    and the caller's description.  Other transfers have no id.'''
+    if mime != ACTIVITY_STREAM_MIME:
+        return None, description
+    try:
+        envelope = json.loads(description)
+        return envelope['transfer'], envelope['description']
+    except (ValueError, TypeError, KeyError):
+        return None, description
+
+
+class _ChunkReader(object):
+    '''Splits a chunked stream back into verified chunks.'''
+
+    def __init__(self):
+        self._buffer = bytearray()
+        # Bytes of the framed stream, and of the data, verified so far
+        self.stream_offset = 0
+        self.verified_bytes = 0
+
+    def feed(self, data):
+        '''Add data from the stream, returning the chunks it completes.
+
+        Raises ChunkChecksumError if a chunk is corrupt.
+        '''
+        self._buffer += data
+        chunks = []
+        while len(self._buffer) >= _CHUNK_HEADER.size:
+            length, crc = _CHUNK_HEADER.unpack_from(self._buffer)
+            if length > FT_CHUNK_SIZE:
+                raise ChunkChecksumError('Chunk of %d bytes' % length)
+            end = _CHUNK_HEADER.size + length
+            if len(self._buffer) < end:
+                break
+            chunk = bytes(self._buffer[_CHUNK_HEADER.size:end])
+            if zlib.crc32(chunk) != crc:
+                raise ChunkChecksumError(
+                    'Chunk at %d is corrupt' % self.verified_bytes)
+            del self._buffer[:end]
+            self.stream_offset += end
+            self.verified_bytes += length
+            chunks.append(chunk)
+        return chunks
+
+    def discard_partial(self):
+        '''Forget a chunk that was cut off, before resuming.'''
+        self._buffer = bytearray()
+
+
+class _RawReader(object):
+    '''Passes an unchunked stream through as it arrives.'''
+
+    def __init__(self):
+        self.stream_offset = 0
+        self.verified_bytes = 0
+
+    def feed(self, data):
+        self.stream_offset += len(data)
+        self.verified_bytes += len(data)
+        return [data]
+
+    def discard_partial(self):
+        pass
+
+
+def _new_memory_output_stream():
+    if hasattr(Gio.MemoryOutputStream, 'new_resizable'):
+        return Gio.MemoryOutputStream.new_resizable()
+    return Gio.MemoryOutputStream()
+
 
 class _BaseFileTransfer(GObject.GObject):
     '''
@@ -429,18 +936,26 @@ class _BaseFileTransfer(GObject.GObject):
         buddy (:class:`sugar3.presence.buddy.Buddy`), other party
             in the transfer
         reason_last_change (FT_REASON_*), reason for the last state change
+        initial_offset (int), where in the file the transfer started
 
     GObject Props:
         state (FT_STATE_*), current state of the transfer
         transferred_bytes (int), number of bytes transferred so far
+
+    The `progress` signal is emitted as bytes are transferred, with the
+    bytes transferred so far and the size of the file.
     '''
 
+    progress = GObject.Signal('progress', arg_types=[object, object])
+
     def __init__(self):
         GObject.GObject.__init__(self)
         self._state = FT_STATE_NONE
         self._transferred_bytes = 0
+        self.initial_offset = 0
 
         self.channel = None
+        self._signal_matches = []
         self.buddy = None
         self.filename = None
         self.file_size = None
@@ -453,13 +968,21 @@ class _BaseFileTransfer(GObject.GObject):
         Setup the file transfer to use a given telepathy channel.  This
         should only be used by direct subclasses of the base file transfer.
         '''
+        # A resumed transfer moves to a new channel; the old one must
+        # not change its state any more
+        for match in self._signal_matches:
+            match.remove()
         self.channel = channel
-        self.channel[CHANNEL_TYPE_FILE_TRANSFER].connect_to_signal(
-            'FileTransferStateChanged', self.__state_changed_cb)
-        self.channel[CHANNEL_TYPE_FILE_TRANSFER].connect_to_signal(
-            'TransferredBytesChanged', self.__transferred_bytes_changed_cb)
-        self.channel[CHANNEL_TYPE_FILE_TRANSFER].connect_to_signal(
-            'InitialOffsetDefined', self.__initial_offset_defined_cb)
+        channel_ft = self.channel[CHANNEL_TYPE_FILE_TRANSFER]
+        self._signal_matches = [
+            channel_ft.connect_to_signal(
+                'FileTransferStateChanged', self.__state_changed_cb),
+            channel_ft.connect_to_signal(
+                'TransferredBytesChanged',
+                self.__transferred_bytes_changed_cb),
+            channel_ft.connect_to_signal(
+                'InitialOffsetDefined', self.__initial_offset_defined_cb),
+        ]
 
         channel_properties = self.channel[PROPERTIES_IFACE]
 
@@ -473,6 +996,7 @@ class _BaseFileTransfer(GObject.GObject):
     def __transferred_bytes_changed_cb(self, transferred_bytes):
         _logger.debug('__transferred_bytes_changed_cb %r', transferred_bytes)
         self.props.transferred_bytes = transferred_bytes
+        self.progress.emit(transferred_bytes, self.file_size)
 
     def _set_transferred_bytes(self, transferred_bytes):
         self._transferred_bytes = transferred_bytes
@@ -522,20 +1046,28 @@ class IncomingFileTransfer(_BaseFileTransfer):
     The `output` property is different depending on how the file was accepted.
     If the file was accepted to a file on the file system, it is a string
     representing the path to the file.  If the file was accepted to memory,
-    it is a :class:`Gio.MemoryOutputStream`.
+    it is a :class:`Gio.MemoryOutputStream`.  If it was accepted to a
+    stream, it is None and the data has gone to the consumer.
+
+    A chunked transfer (see `chunked`) is checked chunk by chunk as it
+    arrives.  If it breaks off or a chunk is corrupt, `interrupted` is
+    emitted with the number of bytes verified, and `resume` continues it
+    from there on a new channel.  If the consumer of a stream raises, the
+    transfer is cancelled and `failed` is emitted with the exception, as
+    it is when a transfer that is not chunked breaks off, or a chunked
+    one breaks off again after `FT_MAX_RESUMES` resumes.
     '''
 
     ready = GObject.Signal('ready', arg_types=[object])
+    interrupted = GObject.Signal('interrupted', arg_types=[object])
+    failed = GObject.Signal('failed', arg_types=[object])
 
     def __init__(self, connection, object_path, props):
         _BaseFileTransfer.__init__(self)
 
-        channel = {}
-        proxy = dbus.Bus().get_object(connection.bus_name, object_path)
-        channel[PROPERTIES_IFACE] = dbus.Interface(proxy, PROPERTIES_IFACE)
-        channel[CHANNEL] = dbus.Interface(proxy, CHANNEL)
-        channel[CHANNEL_TYPE_FILE_TRANSFER] = dbus.Interface(proxy, CHANNEL_TYPE_FILE_TRANSFER)
-        self.set_channel(channel)
+        self._open_channel(connection, object_path)
+        self.chunked = self.mime_type == ACTIVITY_STREAM_MIME
+        self.resumes = 0
 
         self.connect('notify::state', self.__notify_state_cb)
 
@@ -544,6 +1076,21 @@ class IncomingFileTransfer(_BaseFileTransfer):
         self._socket_address = None
         self._socket = None
         self._splicer = None
+        self._input_stream = None
+        # Set when the data is read chunk by chunk rather than spliced
+        self._reader = None
+        self._consumer = None
+
+    def _open_channel(self, connection, object_path):
+        channel = {}
+        proxy = dbus.Bus().get_object(connection.bus_name, object_path)
+        channel[PROPERTIES_IFACE] = dbus.Interface(proxy, PROPERTIES_IFACE)
+        channel[CHANNEL] = dbus.Interface(proxy, CHANNEL)
+        channel[CHANNEL_TYPE_FILE_TRANSFER] = dbus.Interface(proxy, CHANNEL_TYPE_FILE_TRANSFER)
+        self.set_channel(channel)
+        # Each channel of a resumed transfer carries the same envelope
+        self.transfer_id, self.description = _parse_stream_description(
+            self.mime_type, self.description)
 
     def accept_to_file(self, destination_path):
         '''
@@ -559,7 +1106,12 @@ class IncomingFileTransfer(_BaseFileTransfer):
                              destination_path)
 
         self._destination_path = destination_path
-        self._accept()
+        if self.chunked:
+            self._output_stream = Gio.File.new_for_path(
+                destination_path).create(Gio.FileCreateFlags.PRIVATE, None)
+            self._start_reading(self._write_output)
+        else:
+            self._accept()
 
     def accept_to_memory(self):
         '''
@@ -567,15 +1119,54 @@ class IncomingFileTransfer(_BaseFileTransfer):
         :class:`Gio.MemoryOutputStream` accessible via the output prop.
         '''
         self._destination_path = None
+        if self.chunked:
+            self._output_stream = _new_memory_output_stream()
+            self._start_reading(self._write_output)
+        else:
+            self._accept()
+
+    def accept_to_stream(self, consumer):
+        '''
+        Accept the file transfer without storing it.  The data is passed
+        to `consumer` as it arrives, so it never has to be held whole in
+        memory.  `ready` is emitted once all of it has been consumed.
+
+        Args:
+            consumer (callable), called with each piece of the data as
+                :class:`bytes`; for a chunked transfer, each verified
+                chunk in order
+        '''
+        self._destination_path = None
+        self._output_stream = None
+        self._start_reading(consumer)
+
+    def resume(self, connection, object_path):
+        '''
+        Continue an interrupted chunked transfer, offered again by the
+        sender on a new channel, from the last verified chunk.
+        '''
+        self.resumes += 1
+        self._reader.discard_partial()
+        self._open_channel(connection, object_path)
+        # The state is now the new channel's
+        self.notify('state')
+        self._accept(self._reader.stream_offset)
+
+    def _start_reading(self, consumer):
+        self._consumer = consumer
+        self._reader = _ChunkReader() if self.chunked else _RawReader()
         self._accept()
 
-    def _accept(self):
+    def _write_output(self, chunk):
+        self._output_stream.write_all(chunk, None)
+
+    def _accept(self, offset=0):
         channel_ft = self.channel[CHANNEL_TYPE_FILE_TRANSFER]
         self._socket_address = channel_ft.AcceptFile(
             SOCKET_ADDRESS_TYPE_UNIX,
             SOCKET_ACCESS_CONTROL_LOCALHOST,
             '',
-            0,
+            offset,
             byte_arrays=True)
 
     def __notify_state_cb(self, file_transfer, pspec):
@@ -587,6 +1178,11 @@ class IncomingFileTransfer(_BaseFileTransfer):
             self._socket.connect(self._socket_address)
             input_stream = Gio.UnixInputStream.new(self._socket.fileno(), True)
 
+            if self._reader is not None:
+                self._input_stream = input_stream
+                self._read_next()
+                return
+
             if self._destination_path is not None:
                 destination_file = Gio.File.new_for_path(
                     self._destination_path)
@@ -596,11 +1192,7 @@ class IncomingFileTransfer(_BaseFileTransfer):
                 else:
                     self._output_stream = destination_file.append_to()
             else:
-                if hasattr(Gio.MemoryOutputStream, 'new_resizable'):
-                    self._output_stream = \
-                        Gio.MemoryOutputStream.new_resizable()
-                else:
-                    self._output_stream = Gio.MemoryOutputStream()
+                self._output_stream = _new_memory_output_stream()
 
             self._output_stream.splice_async(
                 input_stream,
@@ -612,6 +1204,58 @@ class IncomingFileTransfer(_BaseFileTransfer):
         _logger.debug('__splice_done_cb')
         self.ready.emit(self._destination_path or self._output_stream)
 
+    def _read_next(self):
+        self._input_stream.read_bytes_async(
+            FT_CHUNK_SIZE, GLib.PRIORITY_LOW, None, self.__read_cb, None)
+
+    def __read_cb(self, input_stream, res, user):
+        try:
+            data = input_stream.read_bytes_finish(res).get_data()
+            chunks = self._reader.feed(data) if data else []
+        except (GLib.Error, ChunkChecksumError) as e:
+            _logger.debug('Transfer broke off: %s' % e)
+            if self.chunked:
+                self._stop_reading(False)
+            else:
+                self._fail(e)
+            return
+
+        try:
+            for chunk in chunks:
+                self._consumer(chunk)
+        except Exception as e:
+            _logger.error('Transfer could not be consumed: %s' % e)
+            self._fail(e)
+            return
+        if data:
+            self._read_next()
+        else:
+            read_all = self._reader.stream_offset >= self.file_size
+            self._stop_reading(not self.chunked or read_all)
+
+    def _stop_reading(self, complete):
+        self._input_stream.close(None)
+        self._input_stream = None
+        if complete:
+            if self._output_stream is not None:
+                self._output_stream.close(None)
+            self.ready.emit(self._destination_path or self._output_stream)
+        else:
+            try:
+                self.cancel()
+            except Exception:
+                _logger.debug('Transfer channel already closed')
+            self.interrupted.emit(self._reader.verified_bytes)
+
+    def _fail(self, error):
+        self._input_stream.close(None)
+        self._input_stream = None
+        try:
+            self.cancel()
+        except Exception:
+            _logger.debug('Transfer channel already closed')
+        self.failed.emit(error)
+
     @GObject.Property
     def output(self):
         return self._destination_path or self._output_stream
@@ -626,6 +1270,10 @@ class _BaseOutgoingTransfer(_BaseFileTransfer):
     requested by the application.  You also need to call `_create_channel`
     with the length of the file in bytes during your `__init__`.
 
+    A `chunked` transfer is sent in checksummed chunks, starting from the
+    chunk at the receiver's initial offset, for an
+    :class:`IncomingFileTransfer` to verify and resume.
+
     Args:
         buddy (sugar3.presence.buddy.Buddy), who to send the transfer to
         conn (telepathy.client.conn.Connection), telepathy connection to
@@ -633,11 +1281,17 @@ class _BaseOutgoingTransfer(_BaseFileTransfer):
         filename (str), metadata sent to the receiver
         description (str), metadata sent to the receiver
         mime (str), metadata sent to the receiver
+        chunked (bool), send in checksummed chunks
     '''
 
-    def __init__(self, buddy, conn, filename, description, mime):
+    def __init__(self, buddy, conn, filename, description, mime,
+                 chunked=False):
         _BaseFileTransfer.__init__(self)
         self.connect('notify::state', self.__notify_state_cb)
+        self._chunked = chunked
+        self._input_stream = None
+        self._output_stream = None
+        self._pending = b''
 
         self._socket_address = None
         self._socket = None
@@ -649,6 +1303,8 @@ class _BaseOutgoingTransfer(_BaseFileTransfer):
         self.buddy = buddy
 
     def _create_channel(self, file_size):
+        if self._chunked:
+            file_size = framed_size(file_size)
         object_path, properties_ = self._conn.CreateChannel(dbus.Dictionary({
             CHANNEL + '.ChannelType': CHANNEL_TYPE_FILE_TRANSFER,
             CHANNEL + '.TargetHandleType': CONNECTION_HANDLE_TYPE_CONTACT,
@@ -683,12 +1339,68 @@ class _BaseOutgoingTransfer(_BaseFileTransfer):
                 self._socket.fileno(), True)
 
             input_stream = self._get_input_stream()
+            if self._chunked:
+                self._send_chunks(input_stream, output_stream)
+                return
             output_stream.splice_async(
                 input_stream,
                 Gio.OutputStreamSpliceFlags.CLOSE_SOURCE |
                 Gio.OutputStreamSpliceFlags.CLOSE_TARGET,
                 GLib.PRIORITY_LOW, None, None, None)
 
+    def _send_chunks(self, input_stream, output_stream):
+        # The receiver only resumes at a chunk boundary.
+        skipped = self.initial_offset // _FRAME_SIZE
+        if skipped:
+            input_stream.skip(skipped * FT_CHUNK_SIZE, None)
+        self._input_stream = input_stream
+        self._output_stream = output_stream
+        self._pending = b''
+        self._read_chunk()
+
+    def _read_chunk(self):
+        self._input_stream.read_bytes_async(
+            FT_CHUNK_SIZE - len(self._pending), GLib.PRIORITY_LOW, None,
+            self.__chunk_read_cb, None)
+
+    def __chunk_read_cb(self, input_stream, res, user):
+        try:
+            data = input_stream.read_bytes_finish(res).get_data()
+        except GLib.Error as e:
+            _logger.debug('Reading transfer failed: %s' % e)
+            self._finish_chunks()
+            return
+        self._pending += data
+        if data and len(self._pending) < FT_CHUNK_SIZE:
+            self._read_chunk()
+            return
+        if not self._pending:
+            self._finish_chunks()
+            return
+        frame = frame_chunk(self._pending)
+        self._pending = b''
+        self._output_stream.write_all_async(
+            frame, GLib.PRIORITY_LOW, None, self.__chunk_written_cb,
+            not data)
+
+    def __chunk_written_cb(self, output_stream, res, last):
+        try:
+            output_stream.write_all_finish(res)
+        except GLib.Error as e:
+            _logger.debug('Sending transfer failed: %s' % e)
+            self._finish_chunks()
+            return
+        if last:
+            self._finish_chunks()
+        else:
+            self._read_chunk()
+
+    def _finish_chunks(self):
+        self._input_stream.close(None)
+        self._output_stream.close(None)
+        self._input_stream = None
+        self._output_stream = None
+
 
 class OutgoingFileTransfer(_BaseOutgoingTransfer):
     '''
@@ -702,9 +1414,10 @@ class OutgoingFileTransfer(_BaseOutgoingTransfer):
         path (str), path of the file to send
     '''
 
-    def __init__(self, buddy, conn, path, filename, description, mime):
+    def __init__(self, buddy, conn, path, filename, description, mime,
+                 chunked=False):
         _BaseOutgoingTransfer.__init__(
-            self, buddy, conn, filename, description, mime)
+            self, buddy, conn, filename, description, mime, chunked)
 
         self._path = path
         file_size = os.stat(path).st_size
@@ -722,9 +1435,10 @@ class OutgoingBlobTransfer(_BaseOutgoingTransfer):
         blob (str), data to send
     '''
 
-    def __init__(self, buddy, conn, blob, filename, description, mime):
+    def __init__(self, buddy, conn, blob, filename, description, mime,
+                 chunked=False):
         _BaseOutgoingTransfer.__init__(
-            self, buddy, conn, filename, description, mime)
+            self, buddy, conn, filename, description, mime, chunked)
 
         self._blob = blob
         self._create_channel(len(self._blob))
@@ -733,25 +1447,179 @@ class OutgoingBlobTransfer(_BaseOutgoingTransfer):
         return Gio.MemoryInputStream.new_from_data(self._blob, None)
 
 
-class _TextChannelWrapper(object):
+class MessageTransport(object):
+    '''
+    Base class for the transports a :class:`CollabWrapper` posts
+    messages over.  It queues outgoing messages so that everything
+    posted during one main loop iteration is sent together, highest
+    priority class first, and decodes incoming text into messages for
+    the received callback.
+
+    Subclasses implement `_send`, call `_dispatch` with incoming text,
+    and call the buddy callbacks as buddies come and go.
+    '''
+
+    def __init__(self):
+        self._activity_cb = None
+        self._activity_close_cb = None
+        self._buddy_joined_cb = None
+        self._buddy_left_cb = None
+        self._init_cb = None
+        self._backpressure_cb = None
+        # Messages posted during one main loop iteration are sent
+        # together from an idle callback, one queue per priority class.
+        self._outgoing = [deque() for limit_ in QUEUE_LIMITS]
+        self._flush_id = None
+        self._congested = [False] * len(QUEUE_LIMITS)
+        self.dropped = [0] * len(QUEUE_LIMITS)
+        # Newest wire protocol understood by every peer, see protocol.py
+        self.protocol_version = 0
+
+    def open(self):
+        '''Start carrying messages.'''
+        pass
+
+    def post(self, msg, priority=PRIORITY_GAME):
+        '''Queue a message, returning False if it was dropped.'''
+        if msg is None:
+            return False
+        _logger.debug('post')
+        queue = self._outgoing[priority]
+        limit = QUEUE_LIMITS[priority]
+        if limit is not None and len(queue) >= limit:
+            self.dropped[priority] += 1
+            self._set_congested(priority, True)
+            return False
+        queue.append(msg)
+        if self._flush_id is None:
+            self._flush_id = GLib.idle_add(self._flush)
+        return True
+
+    def _flush(self):
+        '''Send up to `FLUSH_BUDGET` queued messages, highest priority
+        first.  A single message is sent as is, several are framed in
+        one batch if every peer understands batches.'''
+        self._flush_id = None
+        outgoing = []
+        for priority, queue in enumerate(self._outgoing):
+            while queue and len(outgoing) < FLUSH_BUDGET:
+                outgoing.append(queue.popleft())
+            if self._congested[priority] and \
+                    len(queue) <= QUEUE_LIMITS[priority] // 2:
+                self._set_congested(priority, False)
+        if self.protocol_version >= protocol.BATCH_VERSION:
+            if outgoing:
+                self._send(protocol.encode(outgoing, self.protocol_version))
+        else:
+            # Peers that predate batching, or have not said hello yet,
+            # get one message at a time
+            for msg in outgoing:
+                self._send(protocol.encode([msg], self.protocol_version))
+        if any(self._outgoing):
+            self._flush_id = GLib.idle_add(self._flush)
+        return False
+
+    def _set_congested(self, priority, congested):
+        if self._congested[priority] != congested:
+            self._congested[priority] = congested
+            if self._backpressure_cb is not None:
+                self._backpressure_cb(priority, congested)
+
+    def _cancel_flush(self):
+        if self._flush_id is not None:
+            GLib.source_remove(self._flush_id)
+            self._flush_id = None
+        for queue in self._outgoing:
+            queue.clear()
+
+    def get_queue_stats(self):
+        return {'queued': [len(queue) for queue in self._outgoing],
+                'dropped': list(self.dropped)}
+
+    def _send(self, text):
+        raise NotImplementedError()
+
+    def _dispatch(self, buddy, text):
+        '''Decode text from a buddy and pass each message on.'''
+        try:
+            messages = protocol.decode(text)
+        except ValueError as e:
+            _logger.debug('Dropping undecodable message: %s' % e)
+            return
+        for msg in messages:
+            self._activity_cb(buddy, msg)
+
+    def set_received_callback(self, callback):
+        '''Connect the function callback to the signal.
+
+        callback -- callback function taking buddy and text args
+        '''
+        self._activity_cb = callback
+
+    def set_closed_callback(self, callback):
+        '''Connect a callback for when the transport is closed.
+
+        callback -- callback function taking no args
+
+        '''
+        _logger.debug('set closed callback')
+        self._activity_close_cb = callback
+
+    def set_buddy_callbacks(self, joined_cb, left_cb):
+        '''Callbacks taking the transport and a buddy, for transports
+        that track their own buddies.'''
+        self._buddy_joined_cb = joined_cb
+        self._buddy_left_cb = left_cb
+
+    def set_init_callback(self, callback):
+        '''Callback taking the init data sent by `send_init_data`.'''
+        self._init_cb = callback
+
+    def set_backpressure_callback(self, callback):
+        '''Callback taking a priority class and whether its queue is
+        full, called when that changes.'''
+        self._backpressure_cb = callback
+
+    def send_init_data(self, buddy, data):
+        '''Send init data to one buddy over this transport.  Returns
+        False if the transport can not, so a file transfer is used.'''
+        return False
+
+    def cache_members(self):
+        pass
+
+    def forget_buddy(self, buddy):
+        pass
+
+    def close(self):
+        self._cancel_flush()
+        if self._activity_close_cb is not None:
+            self._activity_close_cb()
+
+
+class _TextChannelWrapper(MessageTransport):
     '''Wrapper for a telepathy Text Channel'''
 
     def __init__(self, text_chan, conn):
         '''Connect to the text channel'''
-        self._activity_cb = None
-        self._activity_close_cb = None
+        MessageTransport.__init__(self)
         self._text_chan = text_chan
         self._conn = conn
         self._signal_matches = []
+        # Sender handle -> buddy, so dispatching a message does not
+        # cost several D-Bus round trips.
+        self._buddies = {}
+        self._tp_conn = None
+        # Received messages are acknowledged together from an idle
+        # callback, rather than with one D-Bus call each.
+        self._ack_ids = []
+        self._ack_id = None
+        self._seen_ids = set()
+        self._seen_order = deque()
         m = self._text_chan[CHANNEL_INTERFACE].connect_to_signal(
             'Closed', self._closed_cb)
         self._signal_matches.append(m)
 
-    def post(self, msg):
-        if msg is not None:
-            _logger.debug('post')
-            self._send(json.dumps(msg))
-
     def _send(self, text):
         '''Send text over the Telepathy text channel.'''
         _logger.debug('sending %s' % text)
@@ -775,6 +1643,13 @@ class _TextChannelWrapper(object):
             match.remove()
         self._signal_matches = []
         self._text_chan = None
+        self._buddies.clear()
+        self._tp_conn = None
+        if self._ack_id is not None:
+            GLib.source_remove(self._ack_id)
+            self._ack_id = None
+        self._ack_ids = []
+        self._cancel_flush()
         if self._activity_close_cb is not None:
             self._activity_close_cb()
 
@@ -785,17 +1660,30 @@ class _TextChannelWrapper(object):
         '''
         if self._text_chan is None:
             return
-        self._activity_cb = callback
+        MessageTransport.set_received_callback(self, callback)
         m = self._text_chan[CHANNEL_TYPE_TEXT].connect_to_signal(
             'Received', self._received_cb)
         self._signal_matches.append(m)
 
     def handle_pending_messages(self):
-        '''Get pending messages and show them as received.'''
-        for identity, timestamp, sender, type_, flags, text in \
-            self._text_chan[
-                CHANNEL_TYPE_TEXT].ListPendingMessages(False):
-            self._received_cb(identity, timestamp, sender, type_, flags, text)
+        '''Get pending messages and show them as received.
+
+        All pending messages are fetched with one D-Bus call, dispatched
+        in order, and acknowledged with one more.
+        '''
+        if self._text_chan is None or not self._activity_cb:
+            return False
+        start = time.monotonic()
+        pending = self._text_chan[
+            CHANNEL_TYPE_TEXT].ListPendingMessages(False)
+        for identity, timestamp, sender, type_, flags, text in pending:
+            self._handle_received(identity, sender, type_, text)
+        if self._ack_id is not None:
+            GLib.source_remove(self._ack_id)
+        self._flush_acks()
+        _logger.debug('Drained %d pending messages in %.3fs' %
+                      (len(pending), time.monotonic() - start))
+        return False
 
     def _received_cb(self, identity, timestamp, sender, type_, flags, text):
         '''Handle received text from the text channel.
@@ -804,57 +1692,106 @@ class _TextChannelWrapper(object):
         Calls self._activity_cb which is a callback to the activity.
         '''
         _logger.debug('received_cb %r %s' % (type_, text))
+        if self._handle_received(identity, sender, type_, text) and \
+                self._ack_id is None:
+            self._ack_id = GLib.idle_add(self._flush_acks)
+
+    def _handle_received(self, identity, sender, type_, text):
+        '''Dispatch a received message and queue its acknowledgement.
+        Returns True if it needs acknowledging.'''
         if type_ != 0:
             # Exclude any auxiliary messages
-            return
+            return False
 
-        msg = json.loads(text)
+        if identity in self._seen_ids:
+            # Already handled, from the pending queue or the signal
+            return False
 
         if self._activity_cb:
-            try:
-                self._text_chan[CHANNEL_INTERFACE_GROUP]
-            except Exception:
-                # One to one XMPP chat
-                nick = self._conn[
-                    CONN_INTERFACE_ALIASING].RequestAliases([sender])[0]
-                buddy = {'nick': nick, 'color': '#000000,#808080'}
-                _logger.debug('exception: recieved from sender %r buddy %r' %
-                              (sender, buddy))
-            else:
-                # XXX: cache these
-                buddy = self._get_buddy(sender)
-                _logger.debug('Else: recieved from sender %r buddy %r' %
-                              (sender, buddy))
-
-            self._activity_cb(buddy, msg)
-            self._text_chan[
-                CHANNEL_TYPE_TEXT].AcknowledgePendingMessages([identity])
+            self._seen_ids.add(identity)
+            self._seen_order.append(identity)
+            if len(self._seen_order) > PENDING_SEEN:
+                self._seen_ids.discard(self._seen_order.popleft())
+
+            buddy = self._buddies.get(sender)
+            if buddy is None:
+                buddy = self._lookup_sender(sender)
+                self._buddies[sender] = buddy
+
+            self._dispatch(buddy, text)
+            self._ack_ids.append(identity)
+            return True
         else:
             _logger.debug('Throwing received message on the floor'
                           ' since there is no callback connected. See'
                           ' set_received_callback')
+            return False
+
+    def _flush_acks(self):
+        '''Acknowledge everything dispatched since the last flush.'''
+        self._ack_id = None
+        ack_ids = self._ack_ids
+        self._ack_ids = []
+        if ack_ids and self._text_chan is not None:
+            self._text_chan[
+                CHANNEL_TYPE_TEXT].AcknowledgePendingMessages(ack_ids)
+        return False
 
-    def set_closed_callback(self, callback):
-        '''Connect a callback for when the text channel is closed.
-
-        callback -- callback function taking no args
-
-        '''
-        _logger.debug('set closed callback')
-        self._activity_close_cb = callback
+    def _lookup_sender(self, sender):
+        '''Resolve the sender of a message, bypassing the cache.'''
+        try:
+            self._text_chan[CHANNEL_INTERFACE_GROUP]
+        except Exception:
+            # One to one XMPP chat
+            nick = self._conn[
+                CONN_INTERFACE_ALIASING].RequestAliases([sender])[0]
+            buddy = {'nick': nick, 'color': '#000000,#808080'}
+            _logger.debug('exception: recieved from sender %r buddy %r' %
+                          (sender, buddy))
+        else:
+            buddy = self._get_buddy(sender)
+            _logger.debug('Else: recieved from sender %r buddy %r' %
+                          (sender, buddy))
+        return buddy
+
+    def cache_members(self):
+        '''Resolve the current members of the channel into the buddy
+        cache, so the first message from each of them is fast too.'''
+        if self._text_chan is None:
+            return
+        try:
+            group = self._text_chan[CHANNEL_INTERFACE_GROUP]
+            members = group.GetMembers()
+        except Exception:
+            _logger.debug('Channel has no group members to cache')
+            return
+        for cs_handle in members:
+            if cs_handle not in self._buddies:
+                try:
+                    self._buddies[cs_handle] = self._get_buddy(cs_handle)
+                except Exception:
+                    _logger.debug('Could not resolve handle %r' % cs_handle)
+
+    def forget_buddy(self, buddy):
+        '''Drop cached handles that resolve to a buddy who left.'''
+        for cs_handle in [h for h, b in self._buddies.items() if b == buddy]:
+            del self._buddies[cs_handle]
+
+    def _get_tp_conn(self):
+        '''Get the preferred Telepathy connection, once per channel.'''
+        if self._tp_conn is None:
+            pservice = presenceservice.get_instance()
+            tp_name, tp_path = pservice.get_preferred_connection()
+            obj = dbus.Bus().get_object(tp_name, tp_path)
+            self._tp_conn = (pservice, tp_name, tp_path,
+                             dbus.Interface(obj, CONN_INTERFACE))
+        return self._tp_conn
 
     def _get_buddy(self, cs_handle):
         '''Get a Buddy from a (possibly channel-specific) handle.'''
         # XXX This will be made redundant once Presence Service
         # provides buddy resolution
-
-        # Get the Presence Service
-        pservice = presenceservice.get_instance()
-
-        # Get the Telepathy Connection
-        tp_name, tp_path = pservice.get_preferred_connection()
-        obj = dbus.Bus().get_object(tp_name, tp_path)
-        conn = dbus.Interface(obj, CONN_INTERFACE)
+        pservice, tp_name, tp_path, conn = self._get_tp_conn()
         group = self._text_chan[CHANNEL_INTERFACE_GROUP]
         my_csh = group.GetSelfHandle()
         if my_csh == cs_handle:
@@ -0,0 +1,145 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Dispatch of received messages to handlers registered per action.
+
+Handlers are looked up by the message's `action` in a dict, so adding
+actions does not lengthen the receive path.  A handler may declare the
+fields it needs and their types; the check is compiled once at
+registration and messages that fail it never reach the handler.  A
+handler may also require a minimum protocol version from the sender,
+with an older handler registered for the same action serving older
+peers::
+
+    dispatcher = Dispatcher()
+    dispatcher.register('move', on_move, {'seq': int, 'steps': int})
+    dispatcher.dispatch(buddy, message, version)
+
+Every action gets counters for messages handled, rejected and failed,
+and the time spent in its handler.
+"""
+
+import time
+
+import logging
+_logger = logging.getLogger('Dispatcher')
+
+# Stats key for messages no handler is registered for
+UNHANDLED = '*'
+
+
+class ActionStats:
+    __slots__ = ('count', 'invalid', 'errors', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.invalid = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'invalid': self.invalid,
+            'errors': self.errors,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+        }
+
+
+class _Route:
+    __slots__ = ('handler', 'fields', 'min_version')
+
+    def __init__(self, handler, fields, min_version):
+        self.handler = handler
+        self.fields = fields
+        self.min_version = min_version
+
+
+class Dispatcher:
+    """Calls the handler registered for each message's action"""
+
+    def __init__(self, default=None):
+        # action -> routes, newest protocol version first
+        self._routes = {}
+        self._stats = {UNHANDLED: ActionStats()}
+        self._default = default
+
+    def register(self, action, handler, fields=None, min_version=0):
+        """Call `handler(buddy, message)` for messages with `action`.
+
+        `fields` maps field names the message must have to their type.
+        The handler only serves senders speaking at least `min_version`.
+        """
+        route = _Route(handler, tuple((fields or {}).items()), min_version)
+        routes = self._routes.setdefault(action, [])
+        routes.append(route)
+        routes.sort(key=lambda r: r.min_version, reverse=True)
+        self._stats.setdefault(action, ActionStats())
+
+    def set_default(self, handler):
+        """Call `handler(buddy, message)` for actions nobody registered"""
+        self._default = handler
+
+    def dispatch(self, buddy, message, version=0):
+        """Handle one message, returning False if it was dropped"""
+        action = message.get('action') if isinstance(message, dict) else None
+        routes = self._routes.get(action)
+        if routes is None:
+            return self._run(self._stats[UNHANDLED], self._default,
+                             buddy, message)
+
+        stats = self._stats[action]
+        for route in routes:
+            if route.min_version <= version:
+                break
+        else:
+            stats.invalid += 1
+            return False
+
+        for name, kind in route.fields:
+            if not isinstance(message.get(name), kind):
+                stats.invalid += 1
+                _logger.debug('Dropping %s without a valid %s' %
+                              (action, name))
+                return False
+        return self._run(stats, route.handler, buddy, message)
+
+    def _run(self, stats, handler, buddy, message):
+        if handler is None:
+            stats.count += 1
+            return False
+        start = time.perf_counter()
+        try:
+            handler(buddy, message)
+        except Exception:
+            stats.errors += 1
+            _logger.exception('Handler for %r failed' % (message,))
+            return False
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.count += 1
+            stats.total += elapsed
+            if elapsed > stats.max:
+                stats.max = elapsed
+        return True
+
+    def get_stats(self):
+        """Per-action counters and handler times in seconds"""
+        return {action: stats.summary()
+                for action, stats in self._stats.items()
+                if stats.count or stats.invalid or stats.errors}
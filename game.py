@@ -19,7 +19,15 @@ gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, Gdk, GLib, GdkPixbuf
 import os
 import random
+from collections import deque
 from config import Theme
+from trainer import QTableBot
+from solver import IndividualParitySolver
+import state
+import preview
+from dispatcher import Dispatcher
+from collabwrapper import (buddy_key, PRIORITY_GAME, PRIORITY_SYNC,
+                           QUEUE_LIMITS)
 
 from enum import Enum
 
@@ -31,19 +39,61 @@ from sugar3.graphics.palettemenu import PaletteMenuBox
 from sugar3.graphics.palettemenu import PaletteMenuItem
 from gettext import gettext as _
 
+# Network peers compare a rolling state hash every this many moves
+HASH_INTERVAL = 4
+# Recent moves kept to answer resend requests, and how far ahead of
+# the current move early arrivals are buffered
+MOVE_HISTORY = 64
+# While waiting for the opponent, ask for missed moves this often
+RESEND_PROBE_SECONDS = 10
+# Spectator catch-up requests are answered together this often
+SPECTATOR_BATCH_MS = 500
+# A game whose opponent left is kept this long for them to rejoin
+REJOIN_TIMEOUT_SECONDS = 120
+
 class GameMode(Enum):
     VS_BOT = 1
     VS_PLAYER = 2
     NETWORK_MULTIPLAYER = 3
+    SPECTATOR = 4
+
+
+class ScoringRule(Enum):
+    TOTAL = 1
+    INDIVIDUAL = 2
+
+
+class NetworkTable:
+    """One network game, between us and a single opponent"""
+
+    def __init__(self, game_id, opponent, my_player_number):
+        self.game_id = game_id
+        self.opponent = opponent
+        self.opponent_key = buddy_key(opponent)
+        self.my_player_number = my_player_number
+
+
+class WatchedTable:
+    """A network game between two other buddies that we are watching"""
+
+    def __init__(self, game_id, host_key, guest_key):
+        self.game_id = game_id
+        self.player_keys = (host_key, guest_key)
 
 class Game:
     def __init__(self):
         self.current_theme = 'LIGHT'
         self.game_mode = None
+        self.scoring_rule = ScoringRule.TOTAL
 
         self.N = 0
         self.current_position = 0
         self.total_steps = 0
+        self.player_steps = [0, 0]
+        self.move_seq = 0
+        self.state_hash = 0
+        self.recent_moves = deque(maxlen=MOVE_HISTORY)
+        self.pending_moves = {}
         self.game_over = False
         self.current_player = 1
         self.network_button = None
@@ -55,6 +105,37 @@ class Game:
         self.my_player_number = None
         self.opponent_buddy = None
         self.game_started = False
+        self._resend_probe_id = None
+        self._move_callback = None
+        # Last Journal preview, and the board it shows
+        self._preview = None
+        self._preview_key = None
+
+        # Everyone in the shared activity we could play against
+        self.available_buddies = {}
+        # (game id, buddy key) -> NetworkTable, so messages from other
+        # pairs in the same shared activity are dropped in O(1)
+        self._routes = {}
+        self.active_table = None
+        # Buddy key -> timeout closing the table they left, while they
+        # may still rejoin it
+        self._parked = {}
+
+        self.watched_table = None
+        self._announced_game = None
+        # Oldest move asked for by spectators since the last batch, 0
+        # when one of them needs a full snapshot
+        self._watch_from = None
+        self._watch_flush_id = None
+        # Priority classes whose outgoing queue is backed up
+        self._congested = [False] * len(QUEUE_LIMITS)
+
+        self._dispatcher = Dispatcher()
+        self._register_handlers()
+
+        self.bot = None
+        self._load_bot()
+        self.solver = IndividualParitySolver()
 
         self.screen = Gdk.Screen.get_default()
         self.screen_width = self.screen.get_width()
@@ -100,6 +181,15 @@ class Game:
         except Exception as e:
             print(f"Could not load finish image: {e}")
 
+    def _load_bot(self):
+        """Load a trained Q-table bot if a checkpoint is bundled"""
+        try:
+            qtable_path = os.path.join(os.path.dirname(__file__), 'qtable.bin')
+            if os.path.exists(qtable_path):
+                self.bot = QTableBot.from_checkpoint(qtable_path)
+        except Exception as e:
+            print(f"Could not load bot checkpoint: {e}")
+
     def _create_menu_page(self):
         """Creates the main menu screen with a styled central panel."""
         main_container = Gtk.VBox(halign=Gtk.Align.FILL, valign=Gtk.Align.FILL)
@@ -145,6 +235,24 @@ class Game:
         self.network_button.set_sensitive(False)
         self.network_button.connect("clicked", self._start_network_game_direct)
         button_box.pack_start(self.network_button, False, False, 0)
+
+        self.opponent_chooser = Gtk.ComboBoxText()
+        self.opponent_chooser.connect("changed", self._on_opponent_changed)
+        self.opponent_chooser.set_no_show_all(True)
+        button_box.pack_start(self.opponent_chooser, False, False, 0)
+
+        self.watch_button = Gtk.Button(label="Watch Network Game")
+        self.watch_button.get_style_context().add_class("menu-button")
+        self.watch_button.set_sensitive(False)
+        self.watch_button.connect("clicked", self._watch_announced_game)
+        button_box.pack_start(self.watch_button, False, False, 0)
+
+        self.variant_toggle = Gtk.CheckButton(
+            label="Each player scores their own steps")
+        self.variant_toggle.get_style_context().add_class(
+            "menu-panel-subtitle")
+        self.variant_toggle.connect("toggled", self._on_variant_toggled)
+        button_box.pack_start(self.variant_toggle, False, False, 0)
         
         menu_panel.pack_start(button_box, False, False, 0)
         centering_box.pack_start(menu_panel, False, False, 0)
@@ -154,9 +262,93 @@ class Game:
         self.menu_page_container = main_container
         return main_container
 
+    def _set_scoring_rule(self, rule):
+        """Play by `rule`, and show it on the menu"""
+        self.scoring_rule = rule
+        self.variant_toggle.handler_block_by_func(self._on_variant_toggled)
+        self.variant_toggle.set_active(rule == ScoringRule.INDIVIDUAL)
+        self.variant_toggle.handler_unblock_by_func(self._on_variant_toggled)
+
+    def _on_variant_toggled(self, widget):
+        if widget.get_active():
+            self.scoring_rule = ScoringRule.INDIVIDUAL
+        else:
+            self.scoring_rule = ScoringRule.TOTAL
+
+    def _selected_opponent(self):
+        key = self.opponent_chooser.get_active_id()
+        return self.available_buddies.get(key)
+
+    def _on_opponent_changed(self, widget):
+        buddy = self._selected_opponent()
+        if buddy is not None and self.network_button is not None:
+            self.network_button.set_label(f"Play vs. {buddy.props.nick}")
+
+    def _update_opponent_chooser(self):
+        """Refresh the list of buddies we can start a game with"""
+        selected = self.opponent_chooser.get_active_id()
+        self.opponent_chooser.remove_all()
+        for key, buddy in self.available_buddies.items():
+            self.opponent_chooser.append(key, buddy.props.nick)
+        if selected in self.available_buddies:
+            self.opponent_chooser.set_active_id(selected)
+        elif self.available_buddies:
+            self.opponent_chooser.set_active(0)
+        self.opponent_chooser.set_visible(len(self.available_buddies) > 1)
+        
+        self.buddy_available = bool(self.available_buddies)
+        if self.network_button is not None:
+            self.network_button.set_sensitive(self.buddy_available)
+            if not self.buddy_available:
+                self.network_button.set_label("Play vs. Player (Network)")
+
+    def _open_table(self, game_id, opponent, my_player_number):
+        """Make `game_id` against `opponent` the game we are playing"""
+        if self.active_table is not None:
+            self._close_table(self.active_table)
+        table = NetworkTable(game_id, opponent, my_player_number)
+        self._routes[(game_id, table.opponent_key)] = table
+        self.active_table = table
+        self.opponent_buddy = opponent
+        return table
+
+    def _close_table(self, table):
+        self._routes.pop((table.game_id, table.opponent_key), None)
+        source = self._parked.pop(table.opponent_key, None)
+        if source is not None:
+            GLib.source_remove(source)
+        if self.active_table is table:
+            self.active_table = None
+
+    def _park_table(self, key):
+        if key not in self._parked:
+            self._parked[key] = GLib.timeout_add_seconds(
+                REJOIN_TIMEOUT_SECONDS, self._rejoin_expired, key)
+
+    def _rejoin_expired(self, key):
+        self._parked.pop(key, None)
+        table = self.active_table
+        if table is not None and table.opponent_key == key:
+            print("Opponent did not come back, game abandoned")
+            self._close_table(table)
+        return False
+
+    def _route(self, buddy, message):
+        """The table a message belongs to, if it is one of ours"""
+        return self._routes.get((message.get('game'), buddy_key(buddy)))
+
+    def _post_to_table(self, message, priority=PRIORITY_GAME):
+        """Post a message for the active table, returning False if it
+        was not sent"""
+        if self._collab and self.active_table is not None:
+            message['game'] = self.active_table.game_id
+            return self._collab.post(message, priority)
+        return False
+
     def _start_network_game_direct(self, widget):
         """Start network game directly without lobby"""
-        if not self.buddy_available or not self.opponent_buddy:
+        opponent = self._selected_opponent()
+        if opponent is None:
             print("ERROR: No buddy available for network game")
             return
         
@@ -170,19 +362,25 @@ class Game:
             
             N = random.randint(8, 20)
             self.N = N
+            table = self._open_table(random.getrandbits(31), opponent, 1)
             
             initial_state = {
                 'action': 'game_start',
+                'game': table.game_id,
+                'guest': table.opponent_key,
                 'N': N,
                 'current_player': 1,
                 'host_player': 1,
-                'guest_player': 2
+                'guest_player': 2,
+                'scoring_rule': self.scoring_rule.value
             }
             print(f"Host starting new game with N={N}")
             
             if self._collab:
-                self._collab.post(initial_state)
-                print(f"Sent game_start message: {initial_state}")
+                if self._collab.post(initial_state):
+                    print(f"Sent game_start message: {initial_state}")
+                else:
+                    print("ERROR: game_start message could not be sent")
             
             self._init_network_game(initial_state)
             
@@ -230,6 +428,11 @@ class Game:
         self.N = 0
         self.current_position = 0
         self.total_steps = 0
+        self.player_steps = [0, 0]
+        self.move_seq = 0
+        self.state_hash = 0
+        self.recent_moves = deque(maxlen=MOVE_HISTORY)
+        self.pending_moves = {}
         self.game_over = False
         self.current_player = 1
         
@@ -314,19 +517,26 @@ class Game:
         if self.current_player == 2 and self.game_mode == GameMode.VS_BOT:
             return 
         
-        self.current_position -= steps
-        self.total_steps += steps
+        self._apply_move(steps)
         
         if self.game_mode == GameMode.NETWORK_MULTIPLAYER and self._collab:
             move_message = {
                 'action': 'move',
-                'player': self.current_player,
-                'steps': steps,
-                'new_position': self.current_position,
-                'total_steps': self.total_steps
+                'seq': self.move_seq,
+                'steps': steps
             }
             try:
-                self._collab.post(move_message)
+                if not self._post_to_table(move_message):
+                    # The opponent's resend probe asks for it again
+                    print(f"ERROR: Move {self.move_seq} could not be sent")
+                at_end = self.current_position <= 0
+                if self.move_seq % HASH_INTERVAL == 0 or at_end:
+                    if not self._post_to_table({
+                            'action': 'state_hash',
+                            'seq': self.move_seq,
+                            'hash': self.state_hash}):
+                        print(f"ERROR: State hash {self.move_seq}"
+                              f" could not be sent")
             except Exception as e:
                 print(f"ERROR: Failed to send move: {e}")
         
@@ -343,40 +553,74 @@ class Game:
         elif self.game_mode == GameMode.NETWORK_MULTIPLAYER:
             self.current_player = 2 if self.current_player == 1 else 1
             self._update_ui_state()
+            self._schedule_resend_probe()
 
     def _computer_move(self):
         if self.game_over: return False
-        ideal_move = self.current_position % 4
-        steps = ideal_move if ideal_move != 0 else random.randint(1, 3)
-        steps = min(steps, self.current_position, 3)
-        if steps == 0: steps = 1
-        self.current_position -= steps
-        self.total_steps += steps
+        steps = None
+        if self.scoring_rule == ScoringRule.INDIVIDUAL:
+            steps = self._solver_move()
+        elif self.bot is not None:
+            steps = self.bot.choose_move(self.current_position,
+                                         self.total_steps,
+                                         self.current_player)
+        if steps is None:
+            ideal_move = self.current_position % 4
+            steps = ideal_move if ideal_move != 0 else random.randint(1, 3)
+            steps = min(steps, self.current_position, 3)
+            if steps == 0: steps = 1
+        self._apply_move(steps)
         if not self._check_game_over():
             self.current_player = 1
             self._update_ui_state()
         return False
 
+    def _apply_move(self, steps):
+        """Move the current player by `steps`.  Every mode, and both
+        network peers, advance the game only through here."""
+        self.current_position -= steps
+        self.total_steps += steps
+        self.player_steps[self.current_player - 1] += steps
+        self.move_seq += 1
+        self.recent_moves.append((self.move_seq, steps))
+        state_hash = self.state_hash * 31 + self.state_key()
+        self.state_hash = state_hash & 0xFFFFFFFF
+        self._report_move({'seq': self.move_seq,
+                           'player': self.current_player,
+                           'steps': steps})
+
+    def _solver_move(self):
+        """Perfect move for the individual scoring variant"""
+        self.solver.ensure(self.current_position + 1)
+        return self.solver.move_for_state(self.state_key())
+
+    def state_key(self):
+        """Current state packed into an int, see `state.encode`"""
+        flags = state.FLAG_GAME_OVER if self.game_over else 0
+        if self.scoring_rule == ScoringRule.INDIVIDUAL:
+            flags |= state.FLAG_INDIVIDUAL
+        return state.encode(self.current_position,
+                            self.current_player - 1,
+                            self.total_steps & 1,
+                            self.player_steps[0] & 1,
+                            self.player_steps[1] & 1,
+                            flags)
+
+    def _scored_steps(self):
+        """Steps whose parity decides the game: the combined total, or
+        player 1's own steps in the individual scoring variant"""
+        if self.scoring_rule == ScoringRule.INDIVIDUAL:
+            return self.player_steps[0]
+        return self.total_steps
+
+    def _winner(self):
+        """Player 1 wins when the scored steps are even"""
+        return 1 if self._scored_steps() % 2 == 0 else 2
+
     def _check_game_over(self):
         if self.current_position <= 0:
             self.current_position = 0
             self.game_over = True
-            
-            if self.game_mode == GameMode.NETWORK_MULTIPLAYER and self._collab:
-                is_total_even = self.total_steps % 2 == 0
-                winner = 1 if is_total_even else 2
-                
-                game_over_message = {
-                    'action': 'game_over',
-                    'total_steps': self.total_steps,
-                    'winner': winner,
-                    'final_position': self.current_position
-                }
-                try:
-                    self._collab.post(game_over_message)
-                except Exception as e:
-                    print(f"ERROR: Failed to send game over: {e}")
-            
             self._update_ui_state()
             self._show_game_over_dialog()
             return True
@@ -384,7 +628,7 @@ class Game:
 
     def _show_game_over_dialog(self):
         """Show game over dialog with winner information"""
-        is_total_even = self.total_steps % 2 == 0
+        is_total_even = self._scored_steps() % 2 == 0
         
         if self.game_mode == GameMode.VS_BOT:
             winner_text = "You win!" if is_total_even else "Computer wins!"
@@ -395,12 +639,14 @@ class Game:
                 winner_text = "You win!" if self.my_player_number == 1 else f"{self.opponent_buddy.props.nick} wins!"
             else:
                 winner_text = "You win!" if self.my_player_number == 2 else f"{self.opponent_buddy.props.nick} wins!"
+        elif self.game_mode == GameMode.SPECTATOR:
+            winner_text = f"{self._player_name(self._winner())} wins!"
         
         GLib.timeout_add(1000, lambda: self._delayed_game_over_dialog(winner_text))
 
     def _delayed_game_over_dialog(self, winner_text):
         """Show Sugar-style game over dialog with winner information"""
-        is_total_even = self.total_steps % 2 == 0
+        is_total_even = self._scored_steps() % 2 == 0
         
         if self.game_mode == GameMode.VS_BOT:
             winner_icon = "emblem-favorite" if is_total_even else "computer"
@@ -411,6 +657,8 @@ class Game:
                 winner_icon = "emblem-favorite"
             else:
                 winner_icon = "avatar-user"
+        elif self.game_mode == GameMode.SPECTATOR:
+            winner_icon = "avatar-user"
         
         try:
             parent_window = None
@@ -493,7 +741,14 @@ class Game:
             stats_box.set_halign(Gtk.Align.CENTER)
             
             steps_label = Gtk.Label()
-            steps_label.set_markup(f'<span size="large">Total Steps: <b>{self.total_steps}</b></span>')
+            if self.scoring_rule == ScoringRule.INDIVIDUAL:
+                steps_label.set_markup(
+                    f'<span size="large">Player 1 Steps: '
+                    f'<b>{self.player_steps[0]}</b></span>')
+            else:
+                steps_label.set_markup(
+                    f'<span size="large">Total Steps: '
+                    f'<b>{self.total_steps}</b></span>')
             stats_box.pack_start(steps_label, False, False, 0)
             
             steps_type = "Even" if is_total_even else "Odd"
@@ -687,7 +942,7 @@ class Game:
             self.grid_container.show_all()
         
         if self.game_over:
-            is_total_even = self.total_steps % 2 == 0
+            is_total_even = self._scored_steps() % 2 == 0
             if self.game_mode == GameMode.VS_BOT:
                 winner = "You" if is_total_even else "Computer"
             elif self.game_mode == GameMode.VS_PLAYER:
@@ -697,6 +952,8 @@ class Game:
                     winner = "You" if self.my_player_number == 1 else (self.opponent_buddy.props.nick if self.opponent_buddy else "Player 1")
                 else:
                     winner = "You" if self.my_player_number == 2 else (self.opponent_buddy.props.nick if self.opponent_buddy else "Player 2")
+            elif self.game_mode == GameMode.SPECTATOR:
+                winner = self._player_name(self._winner())
             
             result_color = self._rgb_to_css(theme_colors['SUCCESS'])
             self.title_label.set_markup(f"<span size='x-large' weight='bold' color='{result_color}'>{winner.upper()} WINS!</span>")
@@ -715,15 +972,25 @@ class Game:
                     opponent_name = self.opponent_buddy.props.nick if self.opponent_buddy else "Opponent"
                     turn_text = f"{opponent_name}'s Turn"
                 mode_text = "Network Game"
+            elif self.game_mode == GameMode.SPECTATOR:
+                turn_text = f"{self._player_name(self.current_player)}'s Turn"
+                mode_text = "Watching Network Game"
             
             self.title_label.set_markup(f"<span size='x-large' weight='bold' color='{text_color}'>{mode_text}</span>")
-            self.info_label.set_markup(f"<span color='{text_color}'>Grid: {self.N} | Steps: {self.total_steps} | <span weight='bold'>{turn_text}</span></span>")
+            if self.scoring_rule == ScoringRule.INDIVIDUAL:
+                steps_text = (f"P1 Steps: {self.player_steps[0]} | "
+                              f"P2 Steps: {self.player_steps[1]}")
+            else:
+                steps_text = f"Steps: {self.total_steps}"
+            self.info_label.set_markup(f"<span color='{text_color}'>Grid: {self.N} | {steps_text} | <span weight='bold'>{turn_text}</span></span>")
         
         is_human_turn = True
         if self.game_mode == GameMode.VS_BOT:
             is_human_turn = (self.current_player == 1)
         elif self.game_mode == GameMode.NETWORK_MULTIPLAYER:
             is_human_turn = (self.current_player == self.my_player_number)
+        elif self.game_mode == GameMode.SPECTATOR:
+            is_human_turn = False
         
         for i, button in enumerate(self.move_buttons):
             can_move = self.current_position - (i + 1) >= 0
@@ -733,16 +1000,24 @@ class Game:
         """Reset the game for all modes"""
         if self.game_mode != GameMode.NETWORK_MULTIPLAYER:
             self.N = random.randint(8, 20)
+        self.solver.ensure(self.N)
         self.current_position = self.N - 1
         self.total_steps = 0
+        self.player_steps = [0, 0]
+        self.move_seq = 0
+        self.state_hash = 0
+        self.recent_moves = deque(maxlen=MOVE_HISTORY)
+        self.pending_moves = {}
         self.game_over = False
         self.current_player = 1
+        self._build_board()
         
-        if hasattr(self, 'grid_container'):
-            for child in self.grid_container.get_children():
-                child.destroy()
+    def _build_board(self):
+        """Build the board for N and show the current position on it"""
+        self.solver.ensure(self.N)
         self._create_game_grid()
-        
+        self._report_move(None)
+
     def _create_game_grid(self):
         """Create game grid for all game modes"""
         if not hasattr(self, 'grid_container'):
@@ -806,7 +1081,7 @@ class Game:
         self.grid_container.pack_start(grid_box, False, False, 0)
         self.grid_container.show_all()
         
-        self._apply_theme()
+        self._apply_theme(update_board=False)
         self._update_ui_state()
             
     def _rgb_to_css(self, color):
@@ -818,7 +1093,7 @@ class Game:
         if len(color) >= 3: return Gdk.RGBA(color[0]/255, color[1]/255, color[2]/255, 1.0)
         return Gdk.RGBA(0, 0, 0, 1.0)
     
-    def _apply_theme(self):
+    def _apply_theme(self, update_board=True):
         theme_colors = Theme.LIGHT if self.current_theme == 'LIGHT' else Theme.DARK
         bg_color = self._rgb_to_gdk(theme_colors['BG'])
 
@@ -836,7 +1111,7 @@ class Game:
 
         self._update_css_theme()
 
-        if self.game_mode and hasattr(self, 'cell_contents'):
+        if update_board and self.game_mode and hasattr(self, 'cell_contents'):
             self._update_ui_state()
 
     def _update_css_theme(self):
@@ -924,6 +1199,15 @@ class Game:
         self.current_theme = 'DARK' if self.current_theme == 'LIGHT' else 'LIGHT'
         self._apply_theme()
 
+    def set_move_callback(self, callback):
+        """Call `callback(move)` with each move made, or with None when
+        the board was set up afresh"""
+        self._move_callback = callback
+
+    def _report_move(self, move):
+        if self._move_callback is not None:
+            self._move_callback(move)
+
     def set_collab_wrapper(self, collab):
         """Set the collaboration wrapper reference"""
         self._collab = collab
@@ -933,117 +1217,310 @@ class Game:
     def on_collaboration_joined(self):
         """Called when we successfully join a shared activity"""
         print("Successfully joined shared activity")
-        self.buddy_available = False
         self.opponent_buddy = None
         self.game_started = False
 
     def on_buddy_joined(self, buddy):
         """Called when another player joins"""
         print(f"Buddy joined: {buddy.props.nick}")
-        self.buddy_available = True
-        self.opponent_buddy = buddy
+        key = buddy_key(buddy)
+        self.available_buddies[key] = buddy
+        if key in self._parked:
+            # Back for the game they left, see _rejoin_table
+            GLib.source_remove(self._parked.pop(key))
+            self.active_table.opponent = buddy
+            self.opponent_buddy = buddy
         
-        if hasattr(self, 'network_button') and self.network_button is not None:
-            try:
-                self.network_button.set_sensitive(True)
-                self.network_button.set_label(f"Play vs. {buddy.props.nick}")
-                print(f"Network button enabled for {buddy.props.nick}")
-            except Exception as e:
-                print(f"ERROR: Failed to update network button: {e}")
-        else:
-            print("WARNING: network_button not available yet")
+        try:
+            self._update_opponent_chooser()
+        except Exception as e:
+            print(f"ERROR: Failed to update network button: {e}")
 
     def on_buddy_left(self, buddy):
         """Called when a player leaves"""
         print(f"Buddy left: {buddy.props.nick}")
+        key = buddy_key(buddy)
+        self.available_buddies.pop(key, None)
+        
+        for route, table in list(self._routes.items()):
+            if table.opponent_key != key:
+                continue
+            if table is self.active_table and not self.game_over:
+                # Keep the game, so it can be synced to them if they
+                # come back
+                self._park_table(key)
+                continue
+            self._close_table(table)
+        
+        opponent = self.opponent_buddy
+        if opponent is not None and key not in self._parked:
+            if buddy_key(opponent) == key:
+                self.opponent_buddy = None
         
-        if buddy == self.opponent_buddy:
-            self.buddy_available = False
-            self.opponent_buddy = None
-            
-            if hasattr(self, 'network_button') and self.network_button is not None:
-                try:
-                    self.network_button.set_sensitive(False)
-                    self.network_button.set_label("Play vs. Player (Network)")
-                    print("Network button disabled")
-                except Exception as e:
-                    print(f"ERROR: Failed to update network button: {e}")
-            else:
-                print("WARNING: network_button not available")
+        try:
+            self._update_opponent_chooser()
+        except Exception as e:
+            print(f"ERROR: Failed to update network button: {e}")
+
+    def _register_handlers(self):
+        """Handlers for the network messages, by action"""
+        d = self._dispatcher
+        d.register('game_start', self._on_game_start,
+                   {'game': int, 'N': int, 'current_player': int})
+        d.register('game_busy', self._on_game_busy, {'game': int})
+        d.register('move', self._on_move,
+                   {'game': int, 'seq': int, 'steps': int})
+        d.register('state_hash', self._on_state_hash,
+                   {'game': int, 'seq': int, 'hash': int})
+        d.register('resend', self._on_resend,
+                   {'game': int, 'from': int, 'to': int})
+        d.register('watch', self._on_watch, {'game': int, 'from': int})
+        d.register('table_snapshot', self._on_table_snapshot,
+                   {'game': int, 'players': list, 'N': int, 'move_seq': int})
+        d.register('table_tail', self._on_table_tail,
+                   {'game': int, 'from': int, 'steps': list})
+
+    def get_dispatch_stats(self):
+        """Per-action counts and handler times of received messages"""
+        return self._dispatcher.get_stats()
+
     def on_message_received(self, buddy, message):
         """Handle incoming collaboration messages"""
-        if not isinstance(message, dict):
-            print(f"ERROR: Message is not a dict, it's {type(message)}")
+        version = self._collab.get_peer_version(buddy) if self._collab else 0
+        self._dispatcher.dispatch(buddy, message, version)
+
+    def _from_opponent(self, buddy, message):
+        """Whether a message is from our opponent at the table we play"""
+        table = self._route(buddy, message)
+        if table is None or table is not self.active_table:
+            return False
+        playing = self.game_mode == GameMode.NETWORK_MULTIPLAYER
+        return playing and self.game_started
+
+    def _watching(self, message):
+        """Whether a message is about the table we watch"""
+        if self.game_mode != GameMode.SPECTATOR or self.watched_table is None:
+            return False
+        return message['game'] == self.watched_table.game_id
+
+    def _from_watched_player(self, buddy, message):
+        if not self._watching(message):
+            return False
+        return buddy_key(buddy) in self.watched_table.player_keys
+
+    def _on_game_start(self, buddy, message):
+        guest = message.get('guest')
+        own_key = self._collab.get_own_key() if self._collab else None
+        if guest is not None and own_key is not None and guest != own_key:
+            self._on_game_announced(buddy, message)
+            return
+        if self._playing_other_than(buddy):
+            # Don't leave our opponent waiting for moves that would
+            # never come; tell the sender instead
+            print(f"Declined game from {buddy.props.nick}: already playing")
+            if self._collab:
+                self._collab.post({'action': 'game_busy',
+                                   'game': message['game'],
+                                   'to': buddy_key(buddy)}, PRIORITY_SYNC)
+            return
+        self._reset_for_network_game()
+        self.game_mode = GameMode.NETWORK_MULTIPLAYER
+        self.is_host = False
+        self.my_player_number = 2
+        self.game_started = True
+        self._open_table(message['game'], buddy, 2)
+        print(f"Guest joining game: N={message['N']}")
+        self._init_network_game(message)
+
+    def _playing_other_than(self, buddy):
+        """Whether we are in a game that is not over against someone
+        other than `buddy`"""
+        if self.active_table is None or not self.game_started:
+            return False
+        if self.game_mode != GameMode.NETWORK_MULTIPLAYER or self.game_over:
+            return False
+        return self.active_table.opponent_key != buddy_key(buddy)
+
+    def _on_game_busy(self, buddy, message):
+        """The buddy we asked to play is in another game"""
+        table = self._route(buddy, message)
+        if table is None or not self._collab:
+            return
+        if message.get('to') != self._collab.get_own_key():
+            return
+        print(f"{buddy.props.nick} is already playing another game")
+        self._close_table(table)
+        self.game_started = False
+        self.show_menu()
+
+    def _on_move(self, buddy, message):
+        if self.game_mode == GameMode.SPECTATOR:
+            if self._from_watched_player(buddy, message):
+                self._receive_spectated_move(message)
+        elif self._from_opponent(buddy, message):
+            self._receive_move(message)
+
+    def _on_state_hash(self, buddy, message):
+        if self.game_mode == GameMode.SPECTATOR:
+            if self._from_watched_player(buddy, message):
+                self._check_spectated_hash(message)
+        elif self._from_opponent(buddy, message):
+            self._handle_state_hash(message)
+
+    def _on_resend(self, buddy, message):
+        if self._from_opponent(buddy, message):
+            self._handle_resend(message)
+
+    def _on_watch(self, buddy, message):
+        self._handle_watch_request(message)
+
+    def _on_table_snapshot(self, buddy, message):
+        if not self._watching(message):
+            return
+        seq = message['move_seq']
+        diverged = message.get('state_hash') != self.state_hash
+        if seq > self.move_seq or (seq == self.move_seq and diverged):
+            self._restore_snapshot(message)
+
+    def _on_table_tail(self, buddy, message):
+        if not self._watching(message):
+            return
+        first = message['from']
+        for i, steps in enumerate(message['steps']):
+            self._receive_spectated_move({'seq': first + i, 'steps': steps})
+
+    def _receive_move(self, move_data):
+        """Apply moves in sequence order, buffering any that arrive early
+        and asking the opponent for the ones we missed"""
+        seq = move_data.get('seq')
+        if not isinstance(seq, int) or seq <= self.move_seq:
             return
-            
-        action = message.get('action')
-        print(f"Received message: {action} from {buddy.props.nick}")
-        
-        if action == 'game_start':
-            self._reset_for_network_game()
-            self.game_mode = GameMode.NETWORK_MULTIPLAYER
-            self.is_host = False
-            self.my_player_number = 2
-            self.game_started = True
-            self.opponent_buddy = buddy
-            print(f"Guest joining game: N={message.get('N')}")
-            self._init_network_game(message)
         
-        elif action == 'move':
-            if (self.game_mode == GameMode.NETWORK_MULTIPLAYER and 
-                hasattr(self, 'game_started') and self.game_started):
-                self._handle_opponent_move(message)
+        if seq > self.move_seq + 1:
+            print(f"Move {seq} arrived early, missing moves "
+                  f"{self.move_seq + 1}-{seq - 1}")
+            self._buffer_early_move(seq, move_data)
+            self._request_resend(self.move_seq + 1, seq - 1)
+            return
         
-        elif action == 'game_over':
-            if self.game_mode == GameMode.NETWORK_MULTIPLAYER:
-                self._handle_opponent_game_over(message)
+        self._handle_opponent_move(move_data)
+        while self.move_seq + 1 in self.pending_moves and not self.game_over:
+            next_move = self.pending_moves.pop(self.move_seq + 1)
+            self._handle_opponent_move(next_move)
+        self.pending_moves = {k: v for k, v in self.pending_moves.items()
+                              if k > self.move_seq}
+        self._schedule_resend_probe()
+
+    def _buffer_early_move(self, seq, move_data):
+        """Hold a move until the ones before it arrive.  Moves too far
+        ahead are not kept, the resend after the gap brings them back."""
+        if seq - self.move_seq <= MOVE_HISTORY:
+            self.pending_moves[seq] = move_data
+
+    def _request_resend(self, first, last=0):
+        """Ask the opponent for moves `first` to `last` (0: all newer)"""
+        if self._collab:
+            try:
+                if not self._post_to_table({'action': 'resend', 'from': first,
+                                            'to': last}):
+                    # The next resend probe asks again
+                    print(f"ERROR: Resend request for move {first}"
+                          f" could not be sent")
+            except Exception as e:
+                print(f"ERROR: Failed to request resend: {e}")
+
+    def _handle_resend(self, data):
+        """Send the requested moves again from our recent history"""
+        if not self._collab:
+            return
+        first = data.get('from', 0)
+        last = data.get('to', 0) or self.move_seq
+        if self.recent_moves and first < self.recent_moves[0][0]:
+            print(f"ERROR: Move {first} is too old to resend")
+            return
+        for seq, steps in self.recent_moves:
+            if first <= seq <= last:
+                if not self._post_to_table({'action': 'move', 'seq': seq,
+                                            'steps': steps}):
+                    print(f"ERROR: Move {seq} could not be sent again")
+                    return
+
+    def _schedule_resend_probe(self):
+        """While it's the opponent's turn, periodically ask for moves we
+        may have missed so a lost message can't stall the game"""
+        if self._resend_probe_id is not None:
+            GLib.source_remove(self._resend_probe_id)
+            self._resend_probe_id = None
+        playing = self.game_mode == GameMode.NETWORK_MULTIPLAYER
+        waiting = self.current_player != self.my_player_number
+        if playing and not self.game_over and waiting:
+            self._resend_probe_id = GLib.timeout_add_seconds(
+                RESEND_PROBE_SECONDS, self._resend_probe, self.move_seq)
+
+    def _resend_probe(self, waiting_seq):
+        self._resend_probe_id = None
+        playing = self.game_mode == GameMode.NETWORK_MULTIPLAYER
+        stalled = not self.game_over and self.move_seq == waiting_seq
+        if playing and self.game_started and stalled:
+            self._request_resend(self.move_seq + 1)
+            self._schedule_resend_probe()
+        return False
         
     def _handle_opponent_move(self, move_data):
-        """Process a move received from the opponent"""
-        player = move_data.get('player')
+        """Replay a move received from the opponent through our own rules"""
+        seq = move_data.get('seq')
         steps = move_data.get('steps')
-        new_position = move_data.get('new_position')
-        total_steps = move_data.get('total_steps')
         
-        print(f"Processing opponent move: Player {player} moved {steps} steps")
+        print(f"Processing opponent move {seq}: {steps} steps")
         
-        if player != self.current_player:
-            print(f"ERROR: Received move for player {player} but current player is {self.current_player}")
+        if self.game_over or self.current_player == self.my_player_number:
+            print(f"ERROR: Received move {seq} but it's not the "
+                  f"opponent's turn")
             return
         
-        if player == self.my_player_number:
-            print("ERROR: Received move from opponent but it's marked as our move")
+        if seq != self.move_seq + 1:
+            print(f"ERROR: Received move {seq} but expected move "
+                  f"{self.move_seq + 1}")
             return
         
-        self.current_position = new_position
-        self.total_steps = total_steps
-        
-        if self.current_position <= 0:
-            self.current_position = 0
-            self.game_over = True
-            self._update_ui_state()
-            self._show_game_over_dialog()
-        else:
-            self.current_player = 2 if self.current_player == 1 else 1
-            self._update_ui_state()
-            
-            if self.current_player == self.my_player_number:
-                self._notify_your_turn()
-
-    def _handle_opponent_game_over(self, data):
-        """Handle game over message from opponent"""
-        winner = data.get('winner')
-        total_steps = data.get('total_steps')
-        final_position = data.get('final_position', 0)
+        max_steps = min(3, self.current_position)
+        if not isinstance(steps, int) or not 1 <= steps <= max_steps:
+            print(f"ERROR: Received illegal move of {steps} steps from "
+                  f"position {self.current_position}")
+            return
         
-        print(f"Received game over: winner={winner}, steps={total_steps}")
+        self._apply_move(steps)
         
-        self.total_steps = total_steps
-        self.current_position = final_position
-        self.game_over = True
+        if self._check_game_over():
+            return
         
+        self.current_player = 2 if self.current_player == 1 else 1
         self._update_ui_state()
-        self._show_game_over_dialog()
+        
+        if self.current_player == self.my_player_number:
+            self._notify_your_turn()
+
+    def _handle_state_hash(self, data):
+        """Compare the opponent's state hash with ours for the same move"""
+        seq = data.get('seq')
+        if isinstance(seq, int) and seq > self.move_seq:
+            # The opponent is ahead of us, so we missed their moves.
+            self._request_resend(self.move_seq + 1, seq)
+            return
+        if seq != self.move_seq:
+            print(f"WARNING: Ignoring state hash for move {seq}, "
+                  f"we are at move {self.move_seq}")
+            return
+        if data.get('hash') != self.state_hash:
+            self._on_desync()
+
+    def _on_desync(self):
+        """Our board no longer matches the opponent's"""
+        print(f"ERROR: Game state diverged from opponent at move "
+              f"{self.move_seq}")
+        if hasattr(self, 'connection_status'):
+            self.connection_status.set_markup(
+                "<span color='red'>● Out of sync</span>")
 
     def _notify_your_turn(self):
         """Notify player it's their turn with visual feedback"""
@@ -1071,8 +1548,16 @@ class Game:
             self.game_mode = GameMode.NETWORK_MULTIPLAYER
             
             self.N = initial_state['N']
+            self._set_scoring_rule(ScoringRule(
+                initial_state.get('scoring_rule', ScoringRule.TOTAL.value)))
+            self.solver.ensure(self.N)
             self.current_position = self.N - 1
             self.total_steps = 0
+            self.player_steps = [0, 0]
+            self.move_seq = 0
+            self.state_hash = 0
+            self.recent_moves = deque(maxlen=MOVE_HISTORY)
+            self.pending_moves = {}
             self.current_player = initial_state['current_player']
             self.game_over = False
             print(f"Game initialized: N={self.N}, start_pos={self.current_position}")
@@ -1080,6 +1565,7 @@ class Game:
             self.stack.set_visible_child_name("game_page")
             
             self._create_game_grid()
+            self._schedule_resend_probe()
         except Exception as e:
             print(f"ERROR: Failed to initialize network game: {e}")
             import traceback
@@ -1087,37 +1573,282 @@ class Game:
 
     def get_game_state_for_sync(self):
         """Get current game state for syncing with joining player"""
-        if self.game_mode != GameMode.NETWORK_MULTIPLAYER or not self.game_started:
+        if not self.game_started or self._table_players() is None:
             return {}
         
+        snapshot = self._table_snapshot()
+        snapshot['game_in_progress'] = True
+        return snapshot
+
+    def set_game_state_from_sync(self, data):
+        """Set game state when joining a game in progress"""
+        if not (data.get('game_in_progress') and 'players' in data):
+            return
+        own_key = self._collab.get_own_key() if self._collab else None
+        if own_key in data['players']:
+            self._rejoin_table(data, data['players'].index(own_key) + 1)
+            return
+        print("Watching game in progress...")
+        self._start_spectating(data)
+
+    def _rejoin_table(self, snapshot, my_player_number):
+        """Take our seat again at a table we were playing at"""
+        opponent = self.available_buddies.get(
+            snapshot['players'][2 - my_player_number])
+        if opponent is None:
+            print("Cannot rejoin game in progress: opponent has left")
+            return
+        try:
+            self._open_table(snapshot['game'], opponent, my_player_number)
+            self.game_mode = GameMode.NETWORK_MULTIPLAYER
+            self.is_host = my_player_number == 1
+            self.my_player_number = my_player_number
+            self.game_started = True
+            self.pending_moves = {}
+            self._restore_snapshot(snapshot)
+            self.stack.set_visible_child_name("game_page")
+            # Catch up on moves made while we were away
+            self._schedule_resend_probe()
+        except Exception as e:
+            print(f"ERROR: Failed to rejoin game: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def _table_players(self):
+        """Buddy keys of (player 1, player 2) at the table we show"""
+        watching = self.game_mode == GameMode.SPECTATOR
+        if watching and self.watched_table is not None:
+            return self.watched_table.player_keys
+        playing = self.game_mode == GameMode.NETWORK_MULTIPLAYER
+        if playing and self.active_table is not None and self._collab:
+            own_key = self._collab.get_own_key()
+            if self.my_player_number == 1:
+                return (own_key, self.active_table.opponent_key)
+            return (self.active_table.opponent_key, own_key)
+        return None
+
+    def _table_snapshot(self):
+        """Everything a spectator needs to follow the table from here on"""
+        if self.game_mode == GameMode.SPECTATOR:
+            game_id = self.watched_table.game_id
+        else:
+            game_id = self.active_table.game_id
         return {
-            'game_in_progress': True,
+            'game': game_id,
+            'players': list(self._table_players()),
             'N': self.N,
             'current_position': self.current_position,
             'total_steps': self.total_steps,
+            'player_steps': list(self.player_steps),
+            'move_seq': self.move_seq,
+            'state_hash': self.state_hash,
+            'scoring_rule': self.scoring_rule.value,
             'current_player': self.current_player,
-            'game_over': self.game_over,
-            'host_player': 1,
-            'guest_player': 2
+            'game_over': self.game_over
         }
 
-    def set_game_state_from_sync(self, data):
-        """Set game state when joining a game in progress"""
-        if data.get('game_in_progress'):
-            print("Joining game in progress...")
-            self.game_mode = GameMode.NETWORK_MULTIPLAYER 
+    def _player_name(self, player_number):
+        keys = self._table_players()
+        buddy = None
+        if keys:
+            buddy = self.available_buddies.get(keys[player_number - 1])
+        if buddy is None:
+            return f"Player {player_number}"
+        return buddy.props.nick
+
+    def _on_game_announced(self, host, message):
+        """Two other buddies started a game"""
+        announced = dict(message,
+                         players=[buddy_key(host), message.get('guest')])
+        if self.game_mode == GameMode.SPECTATOR:
+            # Follow the players we were watching into their next game
+            players = self.watched_table.player_keys
+            if host is not None and buddy_key(host) in players:
+                self._start_spectating(announced)
+            return
+        self._announced_game = announced
+        if hasattr(self, 'watch_button'):
+            self.watch_button.set_sensitive(True)
+
+    def _watch_announced_game(self, widget):
+        if self._announced_game is None:
+            return
+        self._start_spectating(self._announced_game)
+        # The announcement is as old as the game, so catch up from there
+        self._request_catch_up(self.move_seq + 1)
+
+    def _start_spectating(self, snapshot):
+        """Show a table from a snapshot and follow its moves"""
+        try:
+            host_key, guest_key = snapshot['players']
+            self.watched_table = WatchedTable(snapshot['game'], host_key,
+                                              guest_key)
+            self.game_mode = GameMode.SPECTATOR
             self.is_host = False
-            self.my_player_number = 2
+            self.my_player_number = None
             self.game_started = True
-            
-            self.N = data.get('N', 10)
-            self.current_position = data.get('current_position', self.N - 1)
-            self.total_steps = data.get('total_steps', 0)
-            self.current_player = data.get('current_player', 1)
-            self.game_over = data.get('game_over', False)
-            
+            self.pending_moves = {}
+            self._restore_snapshot(snapshot)
             self.stack.set_visible_child_name("game_page")
-            self.reset_game()
+        except Exception as e:
+            print(f"ERROR: Failed to start watching game: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def _restore_snapshot(self, snapshot):
+        """Jump straight to the snapshot, then apply any moves that
+        arrived ahead of it"""
+        self.N = snapshot['N']
+        self.current_position = snapshot.get('current_position', self.N - 1)
+        self.total_steps = snapshot.get('total_steps', 0)
+        self.player_steps = list(snapshot.get('player_steps', [0, 0]))
+        self.move_seq = snapshot.get('move_seq', 0)
+        self.state_hash = snapshot.get('state_hash', 0)
+        self._set_scoring_rule(ScoringRule(
+            snapshot.get('scoring_rule', ScoringRule.TOTAL.value)))
+        self.current_player = snapshot.get('current_player', 1)
+        self.game_over = snapshot.get('game_over', False)
+        self.recent_moves = deque(maxlen=MOVE_HISTORY)
+        self._build_board()
+        
+        pending = self.pending_moves
+        self.pending_moves = {}
+        for seq in sorted(pending):
+            self._receive_spectated_move(pending[seq])
+
+    def _check_spectated_hash(self, data):
+        """Catch up if a player is ahead of us or our board differs"""
+        seq = data['seq']
+        if seq > self.move_seq:
+            self._request_catch_up(self.move_seq + 1)
+        elif seq == self.move_seq and data['hash'] != self.state_hash:
+            self._request_catch_up(0)
+
+    def _receive_spectated_move(self, move_data):
+        seq = move_data.get('seq')
+        if not isinstance(seq, int) or seq <= self.move_seq:
+            return
+        
+        if seq > self.move_seq + 1:
+            self._buffer_early_move(seq, move_data)
+            self._request_catch_up(self.move_seq + 1)
+            return
+        
+        self._apply_spectated_move(move_data.get('steps'))
+        while self.move_seq + 1 in self.pending_moves and not self.game_over:
+            next_move = self.pending_moves.pop(self.move_seq + 1)
+            self._apply_spectated_move(next_move.get('steps'))
+        self.pending_moves = {k: v for k, v in self.pending_moves.items()
+                              if k > self.move_seq}
+
+    def _apply_spectated_move(self, steps):
+        if self.game_over:
+            return
+        max_steps = min(3, self.current_position)
+        if not isinstance(steps, int) or not 1 <= steps <= max_steps:
+            print(f"ERROR: Watched an illegal move of {steps} steps, "
+                  f"asking for a snapshot")
+            self._request_catch_up(0)
+            return
+        
+        self._apply_move(steps)
+        if self._check_game_over():
+            return
+        self.current_player = 2 if self.current_player == 1 else 1
+        self._update_ui_state()
+
+    def _request_catch_up(self, first):
+        """Ask the host for moves from `first` on, or for a snapshot
+        when `first` is 0"""
+        if self._collab and self.watched_table is not None:
+            try:
+                if not self._collab.post({'action': 'watch',
+                                          'game': self.watched_table.game_id,
+                                          'from': first}, PRIORITY_SYNC):
+                    print(f"ERROR: Catch-up request from move {first}"
+                          f" could not be sent")
+            except Exception as e:
+                print(f"ERROR: Failed to request catch-up: {e}")
+
+    def _handle_watch_request(self, message):
+        """Queue a spectator's catch-up request.  Requests are answered
+        together on a timer with one broadcast, so the number of spectators
+        doesn't add to the traffic between the players."""
+        table = self.active_table
+        if self.game_mode != GameMode.NETWORK_MULTIPLAYER or not self.is_host:
+            return
+        if table is None or message.get('game') != table.game_id:
+            return
+        
+        first = message.get('from', 0)
+        if isinstance(first, int) and first >= 0:
+            self._queue_spectator_update(first)
+
+    def _queue_spectator_update(self, first):
+        if self._watch_from is None or first < self._watch_from:
+            self._watch_from = first
+        # While sync traffic is backed up, on_backpressure schedules it
+        if self._watch_flush_id is None and not self._congested[PRIORITY_SYNC]:
+            self._watch_flush_id = GLib.timeout_add(SPECTATOR_BATCH_MS,
+                                                    self._flush_spectators)
+
+    def on_backpressure(self, priority, congested):
+        """Called when outgoing messages of class `priority` back up, or
+        have drained again.  Spectator updates wait until sync traffic
+        has drained, so they don't crowd out game messages."""
+        self._congested[priority] = congested
+        if priority != PRIORITY_SYNC:
+            return
+        if congested and self._watch_flush_id is not None:
+            GLib.source_remove(self._watch_flush_id)
+            self._watch_flush_id = None
+        elif not congested and self._watch_from is not None:
+            self._queue_spectator_update(self._watch_from)
+
+    def _flush_spectators(self):
+        """Answer all queued spectator requests: the tail of recent moves
+        when it reaches back far enough, otherwise a snapshot"""
+        self._watch_flush_id = None
+        first, self._watch_from = self._watch_from, None
+        if first is None or self.active_table is None:
+            return False
+        if self.game_mode != GameMode.NETWORK_MULTIPLAYER:
+            return False
+        
+        oldest = self.recent_moves[0][0] if self.recent_moves else None
+        if first > 0 and oldest is not None and oldest <= first:
+            message = {
+                'action': 'table_tail',
+                'from': first,
+                'steps': [steps for seq, steps in self.recent_moves
+                          if seq >= first]
+            }
+        else:
+            message = self._table_snapshot()
+            message['action'] = 'table_snapshot'
+        
+        try:
+            if not self._post_to_table(message, PRIORITY_SYNC):
+                # The outgoing queue is full; try again next batch
+                self._queue_spectator_update(first)
+        except Exception as e:
+            print(f"ERROR: Failed to update spectators: {e}")
+        return False
+
+    def get_preview(self):
+        """PNG of the board for the Journal, or None outside a game.
+        Saving again without a move in between reuses the last one."""
+        if not self.game_mode or self.N <= 0:
+            return None
+        key = (self.N, self.state_key(), self.current_theme)
+        if key != self._preview_key:
+            light = self.current_theme == 'LIGHT'
+            theme = Theme.LIGHT if light else Theme.DARK
+            self._preview = preview.render(self.N, self.current_position,
+                                           theme, self.player_pixbuf,
+                                           self.finish_pixbuf)
+            self._preview_key = key
+        return self._preview
 
     def save_state(self):
         """Return the current game state as a dictionary for Journal saving"""
@@ -1126,11 +1857,20 @@ class Game:
         state = {}
         
         try:
-            state['game_mode'] = self.game_mode.value if self.game_mode else 1
+            # A watched table cannot be resumed alone, so a spectator
+            # is saved as being at the menu
+            if self.game_mode and self.game_mode != GameMode.SPECTATOR:
+                state['game_mode'] = self.game_mode.value
+            else:
+                state['game_mode'] = GameMode.VS_BOT.value
             state['current_theme'] = self.current_theme
             state['N'] = self.N
             state['current_position'] = self.current_position
             state['total_steps'] = self.total_steps
+            state['player_steps'] = list(self.player_steps)
+            state['move_seq'] = self.move_seq
+            state['state_hash'] = self.state_hash
+            state['scoring_rule'] = self.scoring_rule.value
             state['game_over'] = self.game_over
             state['current_player'] = self.current_player
             
@@ -1138,7 +1878,8 @@ class Game:
             state['my_player_number'] = self.my_player_number
             state['game_started'] = self.game_started
             
-            if self.game_mode and self.N > 0:
+            resumable = self.game_mode and self.game_mode != GameMode.SPECTATOR
+            if resumable and self.N > 0:
                 state['game_in_progress'] = True
             else:
                 state['game_in_progress'] = False
@@ -1155,8 +1896,28 @@ class Game:
         
         return state
 
-    def load_state(self, state):
-        """Load game state from a dictionary"""
+    def _replay_moves(self, moves):
+        """Apply logged moves, stopping at the first that does not
+        follow on from the current one"""
+        callback, self._move_callback = self._move_callback, None
+        try:
+            for move in moves:
+                if self.game_over or move.get('seq') != self.move_seq + 1:
+                    break
+                player = move['player']
+                self.current_player = player
+                self._apply_move(move['steps'])
+                if self.current_position <= 0:
+                    self.current_position = 0
+                    self.game_over = True
+                else:
+                    self.current_player = 2 if player == 1 else 1
+        finally:
+            self._move_callback = callback
+
+    def load_state(self, state, moves=()):
+        """Load game state from a dictionary, then apply the `moves`
+        logged after it was saved"""
         try:
             try:
                 game_mode_value = state.get('game_mode', 1)
@@ -1170,6 +1931,17 @@ class Game:
             self.N = state.get('N', 0)
             self.current_position = state.get('current_position', 0)
             self.total_steps = state.get('total_steps', 0)
+            self.player_steps = list(state.get('player_steps', [0, 0]))
+            self.move_seq = state.get('move_seq', 0)
+            self.state_hash = state.get('state_hash', 0)
+            self.recent_moves = deque(maxlen=MOVE_HISTORY)
+            self.pending_moves = {}
+            try:
+                self._set_scoring_rule(ScoringRule(
+                    state.get('scoring_rule', ScoringRule.TOTAL.value)))
+            except Exception as e:
+                print(f"ERROR: Failed to load scoring_rule: {e}")
+                self._set_scoring_rule(ScoringRule.TOTAL)
             self.game_over = state.get('game_over', False)
             self.current_player = state.get('current_player', 1)
             
@@ -1177,14 +1949,19 @@ class Game:
             self.my_player_number = state.get('my_player_number', None)
             self.game_started = state.get('game_started', False)
             
+            self._replay_moves(moves)
+            
             game_in_progress = state.get('game_in_progress', False)
             
             if game_in_progress and self.N > 0:
                 
+                # Show the saved position as it is, rather than starting
+                # over with reset_game
                 self.stack.set_visible_child_name("game_page")
-                self.reset_game()
-                
-                self._apply_theme()
+                self._build_board()
+                bot_turn = self.current_player == 2 and not self.game_over
+                if self.game_mode == GameMode.VS_BOT and bot_turn:
+                    GLib.timeout_add(1000, self._computer_move)
                 
             else:
                 self.show_menu()
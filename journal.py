@@ -0,0 +1,312 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Saving Journal files off the GTK main loop.
+
+`JournalWriter` encodes and writes on a worker thread.  Each file is
+written to a temporary file next to it, synced and renamed over it, so
+a reader sees either the old contents or the new, never a partial
+write.  Completion is reported on the main loop::
+
+    writer = JournalWriter()
+    writer.write(path, data, on_saved)   # on_saved(path, data, error)
+    writer.wait()                        # block until written
+
+`data` is handed to the worker as it is, so the caller must not change
+it afterwards; build a fresh dict for each write.
+
+`MoveLog` keeps a game in one save file, see `savefile`: a snapshot of
+the game followed by its move history.  A move costs one small synced
+append to the history, and after `COMPACT_MOVES` of them the file is
+rewritten with a fresh snapshot, carrying the history over as it is.
+Once the file has been handed to the Journal it is not appended to, so
+the first move after each Journal save also costs a snapshot, whose
+history is copied over as raw records: well under a millisecond for
+ten thousand moves (see benchmarks/bench_journal.py).
+
+If the activity stops without saving, the file outlives the Journal
+entry and holds the moves made since; see `MoveLog.outlived`.
+"""
+
+import glob
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+from gi.repository import GLib
+
+import savefile
+
+import logging
+_logger = logging.getLogger('Journal')
+
+# Set to indent saved JSON for reading by eye
+PRETTY_ENV = 'ODD_SCORING_PRETTY_SAVE'
+
+# Moves appended to a log before it is compacted into a snapshot
+COMPACT_MOVES = 64
+# Logs of other activity instances untouched this long are removed
+STALE_LOG_SECONDS = 30 * 24 * 60 * 60
+
+
+def dumps(data):
+    """Saved JSON, compact unless `PRETTY_ENV` is set"""
+    if os.environ.get(PRETTY_ENV):
+        return json.dumps(data, indent=2)
+    return json.dumps(data, separators=(',', ':'))
+
+
+def _encode_json(data):
+    return dumps(data).encode('utf-8')
+
+
+def _encode_json_line(data):
+    return ('\n' + json.dumps(data, separators=(',', ':'))).encode('utf-8')
+
+
+def atomic_write(path, content):
+    """Replace the file at `path` with `content` (bytes) in one step"""
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, '.%s.%d.tmp' % (name, os.getpid()))
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _append(path, content):
+    with open(path, 'ab') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def remove_stale_logs(directory, keep, max_age=STALE_LOG_SECONDS):
+    """Remove the logs in `directory`, other than `keep`, and any
+    temporary files, not changed for `max_age` seconds"""
+    cutoff = time.time() - max_age
+    for pattern in ('game-*.log', 'game-*.log.resumed', '.game-*.tmp'):
+        for path in glob.glob(os.path.join(directory, pattern)):
+            try:
+                if path != keep and os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+            except OSError as e:
+                _logger.debug('Removing %s failed: %s' % (path, e))
+
+
+class JournalWriter:
+    """Writes files one at a time on a worker thread"""
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._written = {}
+        self.last_write_time = None
+        self._thread = threading.Thread(target=self._run, name='JournalWriter',
+                                        daemon=True)
+        self._thread.start()
+
+    def write(self, path, data, callback=None, encode=_encode_json):
+        """Save `data` at `path` as the bytes `encode(data)` returns,
+        then call `callback(path, data, error)` from the main loop.
+        `encode` runs on the worker, and defaults to JSON."""
+        self._queue(path, data, callback, encode, False)
+
+    def append(self, path, data, callback=None, encode=_encode_json_line):
+        """Add `encode(data)` to the end of `path`, by default a line
+        of compact JSON"""
+        self._queue(path, data, callback, encode, True)
+
+    def _queue(self, path, data, callback, encode, append):
+        with self._idle:
+            self._pending += 1
+        self._jobs.put((path, data, callback, encode, append))
+
+    def wait(self, timeout=None):
+        """Block until every queued write is done, False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def last_written(self, path):
+        """The data last written to `path`, or None if that or anything
+        appended since failed"""
+        with self._idle:
+            return self._written.get(path)
+
+    def _run(self):
+        while True:
+            path, data, callback, encode, append = self._jobs.get()
+            start = time.perf_counter()
+            error = None
+            try:
+                if append:
+                    _append(path, encode(data))
+                else:
+                    atomic_write(path, encode(data))
+            except Exception as e:
+                _logger.error('Writing %s failed: %s' % (path, e))
+                error = e
+            self.last_write_time = time.perf_counter() - start
+            if callback is not None:
+                GLib.idle_add(callback, path, data, error)
+            with self._idle:
+                if error is None and not append:
+                    self._written[path] = data
+                elif error is not None:
+                    # The file no longer holds what was last written
+                    self._written.pop(path, None)
+                self._pending -= 1
+                self._idle.notify_all()
+
+
+class MoveLog:
+    """A saved game and its move history, moves appended to one file"""
+
+    def __init__(self, writer, path, compact_moves=COMPACT_MOVES):
+        self._writer = writer
+        self.path = path
+        self._compact_moves = compact_moves
+        # Last snapshot queued, and moves appended after it
+        self._data = None
+        self.moves = 0
+        # Moves made while the file could not be appended to, for the
+        # next snapshot to add to the history
+        self._unlogged = []
+        self._appendable = False
+        self._new_game = False
+        self._resumed = False
+        self._shared = False
+
+    def start_game(self):
+        """A new board was set up, so the next snapshot starts a new
+        history, and moves wait for it"""
+        self._unlogged = []
+        self._appendable = False
+        self._new_game = True
+        self._shared = False
+
+    def resume(self, path):
+        """Carry on from the save file at `path`.  It is linked rather
+        than copied, so it is not appended to; the next move starts a
+        new file with the same history."""
+        tmp_path = self.path + '.resumed'
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, self.path)
+        self._data = None
+        self.moves = 0
+        self._unlogged = []
+        self._appendable = False
+        self._new_game = False
+        self._resumed = True
+        self._shared = False
+
+    def snapshot(self, data, callback=None):
+        """Replace the file with `data`, a save with `metadata` and
+        `game_state`, keeping the history"""
+        unlogged = savefile.encode_moves(self._unlogged)
+        new_game = self._new_game
+        self._data = data
+        self.moves = 0
+        self._unlogged = []
+        self._appendable = True
+        self._new_game = False
+        self._resumed = False
+        self._shared = False
+
+        def encode(data):
+            history = unlogged if new_game else \
+                self._saved_history() + unlogged
+            return savefile.encode(data['metadata'], data['game_state'],
+                                   history)
+        self._writer.write(self.path, data, callback, encode)
+
+    def _saved_history(self):
+        # On the worker, after every append queued before the snapshot
+        try:
+            return savefile.SaveFile(self.path).history_bytes()
+        except FileNotFoundError:
+            return b''
+        except (OSError, ValueError) as e:
+            _logger.error('History of %s lost: %s' % (self.path, e))
+            return b''
+
+    def written(self):
+        """Whether the file on disk is the last snapshot, or the save
+        resumed from"""
+        if self._data is None:
+            return self._resumed
+        return self._writer.last_written(self.path) is self._data
+
+    def append(self, move, callback=None):
+        """Log `move`, returning False if a snapshot is needed instead.
+        `callback(path, move, error)` is called once it is written."""
+        if not self._appendable:
+            self._unlogged.append(move)
+            return False
+        self._writer.append(self.path, move, callback,
+                            encode=savefile.encode_move)
+        self.moves += 1
+        return True
+
+    def needs_compaction(self):
+        return self.moves >= self._compact_moves
+
+    def share(self):
+        """The file was linked elsewhere, so it must not grow again;
+        the next move starts a new one with a snapshot"""
+        self._appendable = False
+        self._shared = True
+
+    def in_journal(self):
+        """Whether the file was linked elsewhere with every move since
+        the last snapshot, so it is no longer needed here"""
+        return self._shared and not self._unlogged
+
+    def outlived(self, path):
+        """Whether the file was changed after the save at `path`, as it
+        is when the activity stopped without saving its last moves"""
+        try:
+            if os.path.samefile(self.path, path):
+                return False
+            return os.path.getmtime(self.path) > os.path.getmtime(path)
+        except OSError:
+            return False
+
+    def remove(self):
+        """Delete the file; the next move starts a new one"""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self._data = None
+        self._appendable = False
+        self._resumed = False
+        self._shared = False
@@ -0,0 +1,289 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Loopback collaboration transports.
+
+These carry `CollabWrapper` messages without Telepathy, so network play
+can be exercised and measured without a Sugar presence service::
+
+    hub = LoopbackHub()
+    host = CollabWrapper(host_activity)
+    host.attach_transport(LoopbackTransport(hub, 'host'), leader=True)
+    guest = CollabWrapper(guest_activity)
+    guest.attach_transport(LoopbackTransport(hub, 'guest'))
+
+`LoopbackTransport` connects endpoints inside one process through a
+`LoopbackHub`.  `UnixSocketTransport` does the same between processes
+over a local Unix socket, with the leader listening and relaying.
+Messages are delivered from the GLib main loop, like real traffic.
+"""
+
+import json
+import os
+import socket
+from types import SimpleNamespace
+
+from gi.repository import GLib
+
+from collabwrapper import MessageTransport
+
+import logging
+_logger = logging.getLogger('Loopback')
+
+
+class LoopbackBuddy(object):
+    '''Stands in for a :class:`sugar3.presence.buddy.Buddy`.'''
+
+    def __init__(self, nick, color='#000000,#808080'):
+        self.props = SimpleNamespace(nick=nick, key=nick, color=color)
+
+    def __repr__(self):
+        return 'LoopbackBuddy(%r)' % self.props.nick
+
+
+class LoopbackHub(object):
+    '''Connects the `LoopbackTransport` endpoints of one process.'''
+
+    def __init__(self):
+        self._transports = []
+
+    def _join(self, transport):
+        for other in self._transports:
+            other._buddy_joined(transport.buddy)
+            transport._buddy_joined(other.buddy)
+        self._transports.append(transport)
+
+    def _leave(self, transport):
+        if transport in self._transports:
+            self._transports.remove(transport)
+            for other in self._transports:
+                other._buddy_left(transport.buddy)
+
+    def _broadcast(self, sender, text):
+        for transport in self._transports:
+            if transport is not sender:
+                GLib.idle_add(transport._receive, sender.buddy, text)
+
+    def _send_init(self, buddy, data):
+        for transport in self._transports:
+            if transport.buddy is buddy:
+                GLib.idle_add(transport._receive_init, data)
+                return True
+        return False
+
+
+class LoopbackTransport(MessageTransport):
+    '''An in-process endpoint on a `LoopbackHub`.'''
+
+    def __init__(self, hub, nick):
+        MessageTransport.__init__(self)
+        self._hub = hub
+        self.buddy = LoopbackBuddy(nick)
+
+    def open(self):
+        self._hub._join(self)
+
+    def close(self):
+        self._hub._leave(self)
+        MessageTransport.close(self)
+
+    def _send(self, text):
+        self._hub._broadcast(self, text)
+
+    def send_init_data(self, buddy, data):
+        return self._hub._send_init(buddy, data)
+
+    def _receive(self, buddy, text):
+        if self._activity_cb is not None:
+            self._dispatch(buddy, text)
+        return False
+
+    def _receive_init(self, data):
+        if self._init_cb is not None:
+            self._init_cb(data)
+        return False
+
+    def _buddy_joined(self, buddy):
+        if self._buddy_joined_cb is not None:
+            self._buddy_joined_cb(self, buddy)
+
+    def _buddy_left(self, buddy):
+        if self._buddy_left_cb is not None:
+            self._buddy_left_cb(self, buddy)
+
+
+class UnixSocketTransport(MessageTransport):
+    '''
+    An endpoint connected over a local Unix socket.
+
+    The leader listens on `path` and relays between everyone connected.
+    Each line on the socket is a JSON frame: `{"join": nick}`,
+    `{"leave": nick}`, `{"from": nick, "text": text}` or
+    `{"from": nick, "to": nick, "init": data}`.
+    '''
+
+    def __init__(self, path, nick, listen=False):
+        MessageTransport.__init__(self)
+        self._path = path
+        self._listen = listen
+        self.buddy = LoopbackBuddy(nick)
+        self._server = None
+        self._watches = []
+        # Connected sockets -> (receive buffer, nick or None)
+        self._peers = {}
+        self._buddies = {}
+
+    def open(self):
+        if self._listen:
+            if os.path.exists(self._path):
+                os.unlink(self._path)
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._server.bind(self._path)
+            self._server.listen(8)
+            self._server.setblocking(False)
+            self._watches.append(GLib.io_add_watch(
+                self._server.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN,
+                self.__accept_cb))
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self._path)
+            self._add_peer(sock)
+            self._write(sock, {'join': self.buddy.props.nick})
+
+    def close(self):
+        for watch in self._watches:
+            GLib.source_remove(watch)
+        self._watches = []
+        for sock in list(self._peers):
+            sock.close()
+        self._peers = {}
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            os.unlink(self._path)
+        MessageTransport.close(self)
+
+    def _add_peer(self, sock):
+        sock.setblocking(False)
+        self._peers[sock] = [b'', None]
+        self._watches.append(GLib.io_add_watch(
+            sock.fileno(), GLib.PRIORITY_DEFAULT,
+            GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR,
+            self.__readable_cb, sock))
+
+    def _write(self, sock, frame):
+        try:
+            sock.sendall(json.dumps(frame).encode('utf-8') + b'\n')
+        except OSError as e:
+            _logger.debug('Write failed: %s' % e)
+
+    def _relay(self, frame, exclude=None):
+        for sock in self._peers:
+            if sock is not exclude:
+                self._write(sock, frame)
+
+    def _get_buddy(self, nick):
+        buddy = self._buddies.get(nick)
+        if buddy is None:
+            buddy = self._buddies[nick] = LoopbackBuddy(nick)
+        return buddy
+
+    def _send(self, text):
+        self._relay({'from': self.buddy.props.nick, 'text': text})
+
+    def send_init_data(self, buddy, data):
+        self._relay({'from': self.buddy.props.nick,
+                     'to': buddy.props.nick, 'init': data})
+        return True
+
+    def __accept_cb(self, fd, condition):
+        sock, address_ = self._server.accept()
+        self._add_peer(sock)
+        return True
+
+    def __readable_cb(self, fd, condition, sock):
+        try:
+            data = sock.recv(65536)
+        except BlockingIOError:
+            return True
+        except OSError:
+            data = b''
+        if not data:
+            self._drop_peer(sock)
+            return False
+
+        peer = self._peers[sock]
+        peer[0] += data
+        *lines, peer[0] = peer[0].split(b'\n')
+        for line in lines:
+            if line:
+                self._handle_frame(sock, json.loads(line.decode('utf-8')))
+        return True
+
+    def _drop_peer(self, sock):
+        buffer_, nick = self._peers.pop(sock, (b'', None))
+        sock.close()
+        if self._listen:
+            if nick is not None:
+                self._handle_frame(None, {'leave': nick})
+        else:
+            # Lost the leader, and everyone else with it.
+            for nick in list(self._buddies):
+                self._handle_frame(None, {'leave': nick})
+
+    def _handle_frame(self, sock, frame):
+        if 'join' in frame:
+            nick = frame['join']
+            if self._listen and sock is not None:
+                self._peers[sock][1] = nick
+                # Introduce the newcomer to everyone already here.
+                self._write(sock, {'join': self.buddy.props.nick})
+                for other in self._peers.values():
+                    if other[1] is not None and other[1] != nick:
+                        self._write(sock, {'join': other[1]})
+                self._relay(frame, exclude=sock)
+            if self._buddy_joined_cb is not None:
+                self._buddy_joined_cb(self, self._get_buddy(nick))
+        elif 'leave' in frame:
+            nick = frame['leave']
+            if self._listen:
+                self._relay(frame)
+            if self._buddy_left_cb is not None:
+                self._buddy_left_cb(self, self._buddies.pop(
+                    nick, LoopbackBuddy(nick)))
+        elif 'init' in frame:
+            if frame.get('to') == self.buddy.props.nick:
+                if self._init_cb is not None:
+                    self._init_cb(frame['init'])
+            elif self._listen:
+                self._relay(frame, exclude=sock)
+        elif 'text' in frame:
+            if self._listen:
+                self._relay(frame, exclude=sock)
+            if self._activity_cb is not None:
+                self._dispatch(self._get_buddy(frame['from']), frame['text'])
+
+
+def connect_game(collab, game):
+    '''Wire a :class:`game.Game` to a CollabWrapper the way the activity
+    does, so games can play each other without an activity around them.'''
+    game.set_collab_wrapper(collab)
+    collab.connect('joined', lambda c: game.on_collaboration_joined())
+    collab.connect('buddy_joined', lambda c, b: game.on_buddy_joined(b))
+    collab.connect('buddy_left', lambda c, b: game.on_buddy_left(b))
+    collab.connect('message', lambda c, b, m: game.on_message_received(b, m))
+    collab.connect('backpressure',
+                   lambda c, p, congested: game.on_backpressure(p, congested))
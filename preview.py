@@ -0,0 +1,122 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Journal previews of the board.
+
+The board is drawn with cairo on an image surface and encoded as PNG
+into memory, without the window being on screen and without files.
+"""
+
+import io
+import math
+
+import cairo
+from gi.repository import Gdk
+from sugar3.activity.activity import PREVIEW_SIZE
+
+MARGIN = 12
+# Share of a cell's pitch taken by the cell, the rest is spacing
+CELL_FILL = 0.85
+# Smaller cells are drawn without their number
+MIN_LABELLED_CELL = 18
+
+
+def _set_color(cr, color):
+    cr.set_source_rgb(color[0] / 255, color[1] / 255, color[2] / 255)
+
+
+def _rounded_rect(cr, x, y, size, radius):
+    cr.new_sub_path()
+    cr.arc(x + size - radius, y + radius, radius, -math.pi / 2, 0)
+    cr.arc(x + size - radius, y + size - radius, radius, 0, math.pi / 2)
+    cr.arc(x + radius, y + size - radius, radius, math.pi / 2, math.pi)
+    cr.arc(x + radius, y + radius, radius, math.pi, 3 * math.pi / 2)
+    cr.close_path()
+
+
+def _draw_image(cr, pixbuf, x, y, size):
+    scale = size / max(pixbuf.get_width(), pixbuf.get_height())
+    cr.save()
+    cr.translate(x + (size - pixbuf.get_width() * scale) / 2,
+                 y + (size - pixbuf.get_height() * scale) / 2)
+    cr.scale(scale, scale)
+    Gdk.cairo_set_source_pixbuf(cr, pixbuf, 0, 0)
+    cr.paint()
+    cr.restore()
+
+
+def render(n, position, theme, player_image=None, finish_image=None,
+           size=PREVIEW_SIZE):
+    """PNG of a board of `n` cells with the player on `position`,
+    in `theme` colors.  The images are pixbufs; without them the player
+    and the finish are drawn as dots."""
+    width, height = size
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    cr = cairo.Context(surface)
+    _set_color(cr, theme['BG'])
+    cr.paint()
+
+    # Lay the cells out in rows, from n - 1 down to the finish, as
+    # square as the preview allows
+    columns = max(1, math.ceil(math.sqrt(n * width / height)))
+    rows = math.ceil(n / columns)
+    pitch = min((width - 2 * MARGIN) / columns, (height - 2 * MARGIN) / rows)
+    cell = pitch * CELL_FILL
+    left = (width - pitch * columns) / 2
+    top = (height - pitch * rows) / 2
+
+    cr.select_font_face('Sans', cairo.FONT_SLANT_NORMAL,
+                        cairo.FONT_WEIGHT_BOLD)
+    cr.set_font_size(cell / 3)
+    cr.set_line_width(1)
+    for i in range(n):
+        index = n - 1 - i
+        row, column = divmod(i, columns)
+        x = left + column * pitch + (pitch - cell) / 2
+        y = top + row * pitch + (pitch - cell) / 2
+
+        _rounded_rect(cr, x, y, cell, cell / 8)
+        _set_color(cr, theme['CARD_BG'])
+        cr.fill_preserve()
+        _set_color(cr, theme['GRAY_DARK'])
+        cr.stroke()
+
+        if index == position:
+            image, color = player_image, theme['ERROR']
+        elif index == 0:
+            image, color = finish_image, theme['SUCCESS']
+        else:
+            image, color = None, theme['TEXT']
+        marked = index == position or index == 0
+
+        if marked and image is not None:
+            _draw_image(cr, image, x + cell / 4, y + cell / 12, cell / 2)
+        elif marked:
+            _set_color(cr, color)
+            cr.arc(x + cell / 2, y + cell / 3, cell / 5, 0, 2 * math.pi)
+            cr.fill()
+
+        if cell >= MIN_LABELLED_CELL:
+            label = str(index)
+            extents = cr.text_extents(label)
+            _set_color(cr, color)
+            cr.move_to(x + (cell - extents.width) / 2 - extents.x_bearing,
+                       y + cell - cell / 12)
+            cr.show_text(label)
+
+    buffer = io.BytesIO()
+    surface.write_to_png(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,181 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Compact wire encoding for game messages.
+
+A compact message is a version byte followed by one or more records.
+Each record is an opcode byte, a varint count of fields, and the message
+fields in a fixed order, every field a non-negative varint.  The count
+lets a peer skip records whose opcode it does not know, so adding an
+opcode never costs an older peer the rest of the message.  The bytes
+are base64 encoded and prefixed with `COMPACT_PREFIX` so they can travel
+over the text channel next to plain JSON, which never starts with that
+character.
+
+Messages without an opcode, or with fields the schema does not cover,
+are left to JSON.  Peers announce `PROTOCOL_VERSION` during the
+collaboration handshake and compact messages are only sent when every
+peer speaks the same version.
+"""
+
+import base64
+import json
+
+PROTOCOL_VERSION = 5
+# Peers from this version on, every peer that sends a hello, understand
+# batch envelopes
+BATCH_VERSION = 1
+# Peers from this version on receive file transfers in checksummed chunks
+STREAM_TRANSFER_VERSION = 4
+# Peers from this version on accept small init data inline, as a text
+# channel message; older ones only through a file transfer
+INLINE_INIT_VERSION = 4
+COMPACT_PREFIX = '~'
+ACTION_BATCH = '!!ACTION_BATCH'
+
+# action -> (opcode, field names in wire order)
+MESSAGES = {
+    'move': (1, ('game', 'seq', 'steps')),
+    'state_hash': (4, ('game', 'seq', 'hash')),
+    'resend': (5, ('game', 'from', 'to')),
+    '!!ACTION_PING': (6, ('id',)),
+    '!!ACTION_PONG': (7, ('id',)),
+}
+
+_OPCODES = {opcode: (action, fields)
+            for action, (opcode, fields) in MESSAGES.items()}
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ProtocolError('Truncated varint')
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _encode_record(out, msg):
+    """Append `msg` to `out`, returning False if it has no compact form"""
+    if not isinstance(msg, dict):
+        return False
+    schema = MESSAGES.get(msg.get('action'))
+    if schema is None:
+        return False
+    opcode, fields = schema
+    if len(msg) != len(fields) + 1:
+        return False
+    start = len(out)
+    out.append(opcode)
+    _write_varint(out, len(fields))
+    for name in fields:
+        value = msg.get(name)
+        if type(value) is not int or value < 0:
+            del out[start:]
+            return False
+        _write_varint(out, value)
+    return True
+
+
+def encode_compact(messages):
+    """Encode a list of messages, or return None if any of them has no
+    compact form"""
+    out = bytearray([PROTOCOL_VERSION])
+    for msg in messages:
+        if not _encode_record(out, msg):
+            return None
+    return COMPACT_PREFIX + base64.b64encode(bytes(out)).decode('ascii')
+
+
+def decode_compact(text):
+    """Decode text produced by `encode_compact` into a list of messages"""
+    try:
+        data = base64.b64decode(text[len(COMPACT_PREFIX):], validate=True)
+    except ValueError as e:
+        raise ProtocolError('Bad compact message: %s' % e)
+    if not data or data[0] != PROTOCOL_VERSION:
+        raise ProtocolError('Unsupported protocol version')
+    messages = []
+    pos = 1
+    while pos < len(data):
+        schema = _OPCODES.get(data[pos])
+        count, pos = _read_varint(data, pos + 1)
+        values = []
+        for _ in range(count):
+            value, pos = _read_varint(data, pos)
+            values.append(value)
+        if schema is None:
+            # Added by a newer peer; the records around it still count
+            continue
+        action, fields = schema
+        if count < len(fields):
+            raise ProtocolError('Too few fields for %s' % action)
+        msg = {'action': action}
+        msg.update(zip(fields, values))
+        messages.append(msg)
+    return messages
+
+
+def is_compact(text):
+    return text.startswith(COMPACT_PREFIX)
+
+
+def encode(messages, version=0):
+    """Encode messages for the wire.
+
+    `version` is the oldest protocol spoken by the peers.  Below
+    `PROTOCOL_VERSION`, or when a message has no compact form, this is the
+    JSON encoding used by older peers: the message itself when there is
+    one, or a batch envelope built by `batch` otherwise, which only peers
+    of `BATCH_VERSION` on understand.
+    """
+    if version >= PROTOCOL_VERSION:
+        text = encode_compact(messages)
+        if text is not None:
+            return text
+    if len(messages) == 1:
+        return json.dumps(messages[0])
+    return json.dumps(batch(messages))
+
+
+def decode(text):
+    """Decode wire text into a list of messages"""
+    if is_compact(text):
+        return decode_compact(text)
+    msg = json.loads(text)
+    if isinstance(msg, dict) and msg.get('action') == ACTION_BATCH:
+        return list(msg.get('messages', []))
+    return [msg]
+
+
+def batch(messages):
+    return {'action': ACTION_BATCH, 'messages': list(messages)}
@@ -0,0 +1,185 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Versioned save files made of independently readable sections.
+
+A save file starts with a small header listing its sections::
+
+    MAGIC, version (u8), section count (u8)
+    for each section: id (u8), offset (u32), length (u32)
+
+followed by the section bodies.  Metadata and game state are compact
+JSON.  Readers skip sections they do not know.  The history is a run of
+fixed-size move records; it is always the last section and its length
+is `OPEN`, meaning it runs to the end of the file, so a move is saved by
+appending its record.
+
+`SaveFile` reads only the header when opened and each section when it
+is asked for, so resuming a game reads the state and the few moves made
+after it without touching the rest of the history::
+
+    save = SaveFile(path)
+    state = save.state()
+    moves = save.moves_after(state['move_seq'])
+
+Files without `MAGIC` are the plain JSON saves of earlier versions,
+which have no history, and are read whole.
+"""
+
+import json
+import struct
+
+MAGIC = b'OSSV'
+VERSION = 1
+
+SECTION_METADATA = 1
+SECTION_STATE = 2
+# 3 is unused
+SECTION_HISTORY = 4
+
+# Length of a section that runs to the end of the file
+OPEN = 0xFFFFFFFF
+
+_HEADER = struct.Struct('<4sBB')
+_ENTRY = struct.Struct('<BII')
+# seq, player, steps
+_MOVE = struct.Struct('<IBB')
+
+
+class SaveFileError(ValueError):
+    pass
+
+
+def _json(data):
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def encode(metadata, state, history=b''):
+    """A save file holding `history`, encoded move records"""
+    sections = [(SECTION_METADATA, _json(metadata)),
+                (SECTION_STATE, _json(state))]
+    count = len(sections) + 1
+    parts = [_HEADER.pack(MAGIC, VERSION, count)]
+    offset = _HEADER.size + _ENTRY.size * count
+    for section_id, body in sections:
+        parts.append(_ENTRY.pack(section_id, offset, len(body)))
+        offset += len(body)
+    parts.append(_ENTRY.pack(SECTION_HISTORY, offset, OPEN))
+    parts.extend(body for section_id_, body in sections)
+    parts.append(bytes(history))
+    return b''.join(parts)
+
+
+def encode_move(move):
+    return _MOVE.pack(move['seq'], move['player'], move['steps'])
+
+
+def encode_moves(moves):
+    return b''.join(encode_move(move) for move in moves)
+
+
+def decode_moves(data):
+    """Moves from encoded records, ignoring a record cut short"""
+    end = len(data) - len(data) % _MOVE.size
+    return [{'seq': seq, 'player': player, 'steps': steps}
+            for seq, player, steps in _MOVE.iter_unpack(data[:end])]
+
+
+def _read_legacy(raw):
+    try:
+        data = json.loads(raw.decode('utf-8'))
+    except ValueError as e:
+        # UnicodeDecodeError is a ValueError too
+        raise SaveFileError('Bad save file: %s' % e)
+    if not isinstance(data, dict):
+        raise SaveFileError('Bad save file: not a JSON object')
+    return data
+
+
+class SaveFile:
+    """A save file, each section decoded only when asked for"""
+
+    def __init__(self, path):
+        self.path = path
+        # section id -> (offset, length)
+        self._sections = {}
+        self._legacy = None
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if not header.startswith(MAGIC):
+                f.seek(0)
+                self._legacy = _read_legacy(f.read())
+                self.version = 0
+                return
+            if len(header) < _HEADER.size:
+                raise SaveFileError('Truncated save file header')
+            magic_, self.version, count = _HEADER.unpack(header)
+            if self.version > VERSION:
+                raise SaveFileError('Save file version %d is newer than %d'
+                                    % (self.version, VERSION))
+            table = f.read(_ENTRY.size * count)
+            if len(table) < _ENTRY.size * count:
+                raise SaveFileError('Truncated save file header')
+        for section_id, offset, length in _ENTRY.iter_unpack(table):
+            self._sections[section_id] = (offset, length)
+
+    def _read(self, section_id, start=0, size=None):
+        """Bytes of a section from `start` on, or None if it is missing"""
+        if section_id not in self._sections:
+            return None
+        offset, length = self._sections[section_id]
+        if length != OPEN:
+            size = length - start if size is None else \
+                min(size, length - start)
+        with open(self.path, 'rb') as f:
+            f.seek(offset + start)
+            return f.read(-1 if size is None else max(0, size))
+
+    def _decode(self, section_id, key):
+        if self._legacy is not None:
+            return self._legacy.get(key)
+        data = self._read(section_id)
+        if data is None:
+            return None
+        try:
+            return json.loads(data.decode('utf-8'))
+        except ValueError as e:
+            raise SaveFileError('Bad %s section: %s' % (key, e))
+
+    def metadata(self):
+        return self._decode(SECTION_METADATA, 'metadata')
+
+    def state(self):
+        return self._decode(SECTION_STATE, 'game_state')
+
+    def history_bytes(self):
+        """The history as encoded move records"""
+        if self._legacy is not None:
+            return b''
+        data = self._read(SECTION_HISTORY) or b''
+        return data[:len(data) - len(data) % _MOVE.size]
+
+    def history(self):
+        """Every move saved, oldest first"""
+        return decode_moves(self.history_bytes())
+
+    def moves_after(self, seq):
+        """The saved moves that follow move `seq`, decoding only those"""
+        first = self._read(SECTION_HISTORY, 0, _MOVE.size)
+        if not first or len(first) < _MOVE.size:
+            return []
+        skip = max(0, seq + 1 - _MOVE.unpack(first)[0])
+        return decode_moves(self._read(SECTION_HISTORY, skip * _MOVE.size))
@@ -0,0 +1,155 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Compressed encoding of game state snapshots.
+
+A snapshot is `MAGIC`, a codec byte, and the compact JSON of the state,
+compressed with that codec.  The codec is chosen by size: small states
+are not worth compressing, zlib is used for most, and lzma's better
+ratio pays for its slower speed only on large histories.  Peers list the
+codecs they can decode, and a peer that lists none is sent plain JSON,
+which `Decoder` also accepts.
+
+`Decoder` decompresses data as it arrives, so a snapshot can be decoded
+while it is still being transferred::
+
+    decoder = Decoder()
+    for chunk in chunks:
+        decoder.feed(chunk)
+    state = decoder.finish()
+"""
+
+import json
+import lzma
+import zlib
+
+MAGIC = b'OSS1'
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+
+# Codec names peers announce -> codec byte
+CODECS = {
+    'zlib': CODEC_ZLIB,
+    'lzma': CODEC_LZMA,
+}
+SUPPORTED = tuple(CODECS)
+
+# Smaller snapshots are stored as they are
+COMPRESS_MIN = 1024
+# Snapshots from this size on use lzma when the peer has it.  Below it
+# lzma's slower encoding costs more join time than its smaller output
+# saves, see benchmarks/bench_snapshot.py.
+LZMA_MIN = 1024 * 1024
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def choose_codec(size, codecs=SUPPORTED):
+    """Codec name for `size` bytes of JSON, or None to store it as is"""
+    if size < COMPRESS_MIN:
+        return None
+    if size >= LZMA_MIN and 'lzma' in codecs:
+        return 'lzma'
+    if 'zlib' in codecs:
+        return 'zlib'
+    return None
+
+
+def encode(data, codecs=SUPPORTED, codec=None):
+    """Encode `data` for a peer that decodes `codecs`.  If `codecs` is
+    None the peer predates snapshots and gets plain JSON.  `codec`
+    overrides the choice by size, for archives that favour ratio."""
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    if codecs is None:
+        return raw
+    if codec is None:
+        codec = choose_codec(len(raw), codecs)
+    if codec == 'lzma':
+        body = lzma.compress(raw, preset=6)
+    elif codec == 'zlib':
+        body = zlib.compress(raw, 6)
+    else:
+        body = raw
+    return MAGIC + bytes([CODECS.get(codec, CODEC_NONE)]) + body
+
+
+def decode(blob):
+    decoder = Decoder()
+    decoder.feed(blob)
+    return decoder.finish()
+
+
+class Decoder:
+    """Decodes a snapshot, or plain JSON, fed to it in pieces"""
+
+    def __init__(self):
+        self._header = b''
+        self._codec = None
+        self._decompressor = None
+        self._parts = []
+
+    def feed(self, data):
+        if self._codec is None:
+            self._header += data
+            if len(self._header) <= len(MAGIC) and \
+                    MAGIC.startswith(self._header):
+                return
+            if self._header.startswith(MAGIC):
+                self._start(self._header[len(MAGIC)],
+                            self._header[len(MAGIC) + 1:])
+            else:
+                self._start(CODEC_NONE, self._header)
+            self._header = b''
+        elif data:
+            self._decompress(data)
+
+    def _start(self, codec, data):
+        if codec == CODEC_ZLIB:
+            self._decompressor = zlib.decompressobj()
+        elif codec == CODEC_LZMA:
+            self._decompressor = lzma.LZMADecompressor()
+        elif codec != CODEC_NONE:
+            raise SnapshotError('Unknown snapshot codec %d' % codec)
+        self._codec = codec
+        if data:
+            self._decompress(data)
+
+    def _decompress(self, data):
+        if self._decompressor is None:
+            self._parts.append(data)
+            return
+        try:
+            self._parts.append(self._decompressor.decompress(data))
+        except (zlib.error, lzma.LZMAError) as e:
+            raise SnapshotError('Corrupt snapshot: %s' % e)
+
+    def finish(self):
+        """The decoded state, once all data has been fed"""
+        if self._codec is None:
+            # Never got past a partial header
+            self._start(CODEC_NONE, self._header)
+        if self._codec == CODEC_ZLIB:
+            self._parts.append(self._decompressor.flush())
+        if self._decompressor is not None and not self._decompressor.eof:
+            raise SnapshotError('Truncated snapshot')
+        try:
+            return json.loads(b''.join(self._parts).decode('utf-8'))
+        except ValueError as e:
+            raise SnapshotError('Bad snapshot: %s' % e)
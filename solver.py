@@ -0,0 +1,144 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Perfect-play solver for the individual scoring variant.
+
+In this variant each player only counts the steps they took themselves.
+When the runner reaches cell 0, player 1 wins if their own step count
+is even, otherwise player 2 wins.
+
+Every state (position, my parity, opponent parity, side to move) is
+solved once and stored in a nibble: the low two bits hold the best
+move (1-3) and bit 2 is set when the player to move can force a win.
+Two states share a byte, so a position costs 4 bytes.
+
+Positions only depend on smaller positions, so the table can be grown
+in place: `ensure` solves just the new positions and keeps the prefix.
+
+The bot looks moves up by packed state (see state.py), so the best move
+is also kept in a byte per packed key, 64 bytes a position.  A lookup is
+then a single index, without unpacking the key or allocating.
+"""
+
+from state import POSITION_SHIFT, P1_PARITY_BIT, P2_PARITY_BIT, SIDE_BIT
+
+MAX_STEP = 3
+
+_STATES_PER_POSITION = 8
+_BYTES_PER_POSITION = _STATES_PER_POSITION // 2
+_WIN_BIT = 0x4
+_MOVE_MASK = 0x3
+
+
+def _state_index(position, my_parity, opp_parity, side):
+    return (((position << 1 | my_parity) << 1 | opp_parity) << 1) | side
+
+
+def _mover_wins_at_end(my_parity, opp_parity, side):
+    """Whether the player who just reached cell 0 won"""
+    player1_parity = my_parity if side == 0 else opp_parity
+    return (player1_parity == 0) == (side == 0)
+
+
+class IndividualParitySolver:
+    """Bit-packed win/move tables for the individual scoring variant
+
+    `side` is 0 when player 1 is to move and 1 for player 2.
+    """
+
+    def __init__(self, max_position=0):
+        self.max_position = 0
+        self._table = bytearray(_BYTES_PER_POSITION)
+        # Packed state key -> best move
+        self._moves = bytearray(1 << POSITION_SHIFT)
+        self._solve(1, max_position)
+
+    def ensure(self, N):
+        """Make sure every position on a board of size N is solved.
+
+        The table at least doubles when it grows, so asking for slowly
+        increasing board sizes costs amortized constant work per position.
+        """
+        needed = N - 1
+        if needed <= self.max_position:
+            return
+        self._solve(self.max_position + 1,
+                    max(needed, 2 * self.max_position))
+
+    def _get(self, index):
+        byte = self._table[index >> 1]
+        return (byte >> 4) if index & 1 else (byte & 0x0F)
+
+    def _set(self, index, nibble):
+        i = index >> 1
+        if index & 1:
+            self._table[i] = (self._table[i] & 0x0F) | (nibble << 4)
+        else:
+            self._table[i] = (self._table[i] & 0xF0) | nibble
+
+    def _solve(self, start, end):
+        if end < start:
+            return
+        self._table.extend(bytes(_BYTES_PER_POSITION * (end - start + 1)))
+        for position in range(start, end + 1):
+            for my_parity in (0, 1):
+                for opp_parity in (0, 1):
+                    for side in (0, 1):
+                        self._set(_state_index(position, my_parity,
+                                               opp_parity, side),
+                                  self._evaluate(position, my_parity,
+                                                 opp_parity, side))
+            self._moves.extend(self._moves_by_key(position))
+        self.max_position = end
+
+    def _moves_by_key(self, position):
+        """Best moves for every packed key of `position`, in key order"""
+        moves = bytearray(1 << POSITION_SHIFT)
+        for low in range(1 << POSITION_SHIFT):
+            side = low & SIDE_BIT
+            p1_parity = (low & P1_PARITY_BIT) >> 2
+            p2_parity = (low & P2_PARITY_BIT) >> 3
+            if side == 0:
+                moves[low] = self.best_move(position, p1_parity, p2_parity, 0)
+            else:
+                moves[low] = self.best_move(position, p2_parity, p1_parity, 1)
+        return moves
+
+    def _evaluate(self, position, my_parity, opp_parity, side):
+        for steps in range(1, min(MAX_STEP, position) + 1):
+            new_parity = my_parity ^ (steps & 1)
+            remaining = position - steps
+            if remaining == 0:
+                if _mover_wins_at_end(new_parity, opp_parity, side):
+                    return _WIN_BIT | steps
+            elif not self._get(_state_index(remaining, opp_parity,
+                                            new_parity, side ^ 1)) & _WIN_BIT:
+                return _WIN_BIT | steps
+        return 1
+
+    def move_for_state(self, key):
+        """Best move for a packed state from `state.encode`"""
+        return self._moves[key]
+
+    def wins(self, position, my_parity, opp_parity, side):
+        """Whether the player to move can force a win"""
+        return bool(self._get(_state_index(position, my_parity,
+                                           opp_parity, side)) & _WIN_BIT)
+
+    def best_move(self, position, my_parity, opp_parity, side):
+        """Number of steps perfect play takes from this state"""
+        return self._get(_state_index(position, my_parity,
+                                      opp_parity, side)) & _MOVE_MASK
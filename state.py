@@ -0,0 +1,61 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Canonical packed-integer encoding of a game state.
+
+A state is packed into a single int so it can be hashed, compared and
+stored without building tuples:
+
+    bit 0       side to move (0 = player 1, 1 = player 2)
+    bit 1       parity of the total steps
+    bit 2       parity of player 1's own steps
+    bit 3       parity of player 2's own steps
+    bit 4       FLAG_GAME_OVER
+    bit 5       FLAG_INDIVIDUAL (individual scoring variant)
+    bits 6 ...  current position
+"""
+
+SIDE_BIT = 0x01
+PARITY_BIT = 0x02
+P1_PARITY_BIT = 0x04
+P2_PARITY_BIT = 0x08
+FLAG_GAME_OVER = 0x10
+FLAG_INDIVIDUAL = 0x20
+
+POSITION_SHIFT = 6
+_LOW_MASK = (1 << POSITION_SHIFT) - 1
+
+
+def encode(position, side=0, parity=0, p1_parity=0, p2_parity=0, flags=0):
+    """Pack a state into an int"""
+    parities = (p2_parity << 3) | (p1_parity << 2) | (parity << 1)
+    return (position << POSITION_SHIFT) | flags | parities | side
+
+
+def decode(key):
+    """Unpack a key into (position, side, parity, p1_parity, p2_parity,
+    flags)"""
+    return (key >> POSITION_SHIFT, key & SIDE_BIT, (key >> 1) & 1,
+            (key >> 2) & 1, (key >> 3) & 1,
+            key & (FLAG_GAME_OVER | FLAG_INDIVIDUAL))
+
+
+def position_of(key):
+    return key >> POSITION_SHIFT
+
+
+def side_of(key):
+    return key & SIDE_BIT
@@ -20,6 +20,7 @@
 # SOFTWARE.
 #
 
+import io
 import os
 from gi.repository import Gtk
 from gi.repository import GLib
@@ -88,17 +89,10 @@ class PygameCanvas(Gtk.EventBox):
         if not hasattr(self, "_screen"):
             return None
 
-        _tmp_dir = os.path.join(self._activity.get_activity_root(), "tmp")
-        _file_path = os.path.join(_tmp_dir, "preview.png")
-
         width = PREVIEW_SIZE[0]
         height = PREVIEW_SIZE[1]
         _surface = pygame.transform.scale(self._screen, (width, height))
-        pygame.image.save(_surface, _file_path)
-
-        f = open(_file_path, "rb")
-        preview = f.read()
-        f.close()
-        os.remove(_file_path)
 
-        return preview
+        buffer = io.BytesIO()
+        pygame.image.save(_surface, buffer, "preview.png")
+        return buffer.getvalue()
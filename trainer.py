@@ -0,0 +1,263 @@
+# This file is part of the Odd Scoring Game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tabular reinforcement learning for the Odd Scoring game.
+
+The trainer runs a batch of headless games side by side and learns a
+Q-table indexed by (position, parity, player), where parity is the
+parity of the total steps taken so far.  The result can be saved to a
+checkpoint and loaded by the game as its computer opponent.
+
+Run from the command line::
+
+    python3 trainer.py --episodes 50000 --output qtable.bin
+"""
+
+import argparse
+import random
+import struct
+import time
+from array import array
+
+MAX_STEP = 3
+PLAYERS = 2
+PARITIES = 2
+
+CHECKPOINT_MAGIC = b'OSQT'
+CHECKPOINT_VERSION = 1
+_HEADER = struct.Struct('<4sHH')
+
+
+def winner_for_total(total_steps):
+    """Player 1 wins when the total number of steps is even"""
+    return 1 if total_steps % 2 == 0 else 2
+
+
+class QTable:
+    """Dense action values indexed by (position, parity, player, steps)"""
+
+    def __init__(self, max_position):
+        self.max_position = max_position
+        size = (max_position + 1) * PARITIES * PLAYERS * MAX_STEP
+        self.values = array('d', bytes(8 * size))
+
+    def offset(self, position, parity, player):
+        """Index of the first action value for a state"""
+        row = (position * PARITIES + parity) * PLAYERS + player - 1
+        return row * MAX_STEP
+
+    def legal_moves(self, position):
+        return range(1, min(MAX_STEP, position) + 1)
+
+    def best_value(self, position, parity, player):
+        base = self.offset(position, parity, player)
+        values = self.values
+        return max(values[base + steps - 1]
+                   for steps in self.legal_moves(position))
+
+    def best_move(self, position, parity, player):
+        """Greedy move for a state, ties broken towards fewer steps"""
+        base = self.offset(position, parity, player)
+        values = self.values
+        best_steps = 1
+        best = values[base]
+        for steps in range(2, min(MAX_STEP, position) + 1):
+            if values[base + steps - 1] > best:
+                best = values[base + steps - 1]
+                best_steps = steps
+        return best_steps
+
+    def save(self, path):
+        """Write the table to a binary checkpoint"""
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION,
+                                 self.max_position))
+            self.values.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """Read a table written by `save`"""
+        with open(path, 'rb') as f:
+            magic, version, max_position = _HEADER.unpack(
+                f.read(_HEADER.size))
+            if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+                raise ValueError('Not a Q-table checkpoint: %r' % path)
+            table = cls(max_position)
+            count = len(table.values)
+            table.values = array('d')
+            table.values.fromfile(f, count)
+        return table
+
+
+class BatchSimulator:
+    """Runs several headless games at once, restarting finished ones"""
+
+    def __init__(self, batch_size, min_n=8, max_n=20, rng=None):
+        self.batch_size = batch_size
+        self.min_n = min_n
+        self.max_n = max_n
+        self.rng = rng or random.Random()
+        self.positions = [0] * batch_size
+        self.totals = [0] * batch_size
+        self.players = [1] * batch_size
+        for i in range(batch_size):
+            self.restart(i)
+
+    def restart(self, i):
+        self.positions[i] = self.rng.randint(self.min_n, self.max_n) - 1
+        self.totals[i] = 0
+        self.players[i] = 1
+
+    def state(self, i):
+        return self.positions[i], self.totals[i] % 2, self.players[i]
+
+    def step(self, i, steps):
+        """Apply a move to game `i`, returning the mover's reward and
+        whether the game ended"""
+        mover = self.players[i]
+        self.positions[i] -= steps
+        self.totals[i] += steps
+        if self.positions[i] == 0:
+            reward = 1.0 if winner_for_total(self.totals[i]) == mover \
+                else -1.0
+            return reward, True
+        self.players[i] = 2 if mover == 1 else 1
+        return 0.0, False
+
+
+class Trainer:
+    """Q-learning or Monte Carlo control over a `BatchSimulator`
+
+    Values are stored from the point of view of the player to move, so
+    the bootstrapped target for a non-terminal move is the negated best
+    value of the opponent's next state.
+    """
+
+    def __init__(self, max_n=20, min_n=8, batch_size=64, alpha=0.1,
+                 epsilon=0.2, method='q', seed=None):
+        if method not in ('q', 'mc'):
+            raise ValueError('Unknown training method: %r' % method)
+        self.rng = random.Random(seed)
+        self.table = QTable(max_n)
+        self.simulator = BatchSimulator(batch_size, min_n, max_n, self.rng)
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.method = method
+        self.episodes = 0
+        self.steps = 0
+        self._trajectories = [[] for _ in range(batch_size)]
+
+    def _choose(self, position, parity, player):
+        if self.rng.random() < self.epsilon:
+            return self.rng.randint(1, min(MAX_STEP, position))
+        return self.table.best_move(position, parity, player)
+
+    def _update(self, index, target):
+        values = self.table.values
+        values[index] += self.alpha * (target - values[index])
+
+    def _finish_episode(self, i, reward):
+        # Monte Carlo: walk the episode backwards, flipping the sign of
+        # the return at every ply since the players alternate.
+        for index in reversed(self._trajectories[i]):
+            self._update(index, reward)
+            reward = -reward
+        self._trajectories[i] = []
+
+    def train(self, episodes):
+        """Train until `episodes` more games have finished.
+
+        Returns a dict with the number of steps taken and the
+        throughput in steps per second.
+        """
+        sim = self.simulator
+        table = self.table
+        target_episodes = self.episodes + episodes
+        start_steps = self.steps
+        start = time.perf_counter()
+
+        while self.episodes < target_episodes:
+            for i in range(sim.batch_size):
+                position, parity, player = sim.state(i)
+                steps = self._choose(position, parity, player)
+                index = table.offset(position, parity, player) + steps - 1
+                reward, done = sim.step(i, steps)
+                self.steps += 1
+
+                if self.method == 'q':
+                    if done:
+                        target = reward
+                    else:
+                        target = -table.best_value(*sim.state(i))
+                    self._update(index, target)
+                else:
+                    self._trajectories[i].append(index)
+                    if done:
+                        self._finish_episode(i, reward)
+
+                if done:
+                    self.episodes += 1
+                    sim.restart(i)
+
+        elapsed = time.perf_counter() - start
+        steps = self.steps - start_steps
+        return {
+            'episodes': episodes,
+            'steps': steps,
+            'seconds': elapsed,
+            'steps_per_second': steps / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class QTableBot:
+    """Computer opponent that plays greedily from a trained Q-table"""
+
+    def __init__(self, table):
+        self.table = table
+
+    @classmethod
+    def from_checkpoint(cls, path):
+        return cls(QTable.load(path))
+
+    def choose_move(self, position, total_steps, player):
+        if position > self.table.max_position:
+            return None
+        return self.table.best_move(position, total_steps % 2, player)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Train a Q-table bot for the Odd Scoring game')
+    parser.add_argument('--episodes', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--max-n', type=int, default=20)
+    parser.add_argument('--method', choices=('q', 'mc'), default='q')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default='qtable.bin')
+    args = parser.parse_args()
+
+    trainer = Trainer(max_n=args.max_n, batch_size=args.batch_size,
+                      method=args.method, seed=args.seed)
+    stats = trainer.train(args.episodes)
+    trainer.table.save(args.output)
+    print(f"Trained {stats['episodes']} episodes ({stats['steps']} steps) "
+          f"in {stats['seconds']:.2f}s: "
+          f"{stats['steps_per_second']:.0f} steps/s")
+    print(f"Saved Q-table to {args.output}")
+
+
+if __name__ == '__main__':
+    main()